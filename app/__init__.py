@@ -27,6 +27,8 @@ def create_app(config_name=None):
     app.json.encoder = CustomJSONEncoder
 
     # Initialize extensions here if needed
+    from app.utils import database
+    database.init_app(app)
 
     # Create upload directory if it doesn't exist
     upload_dir = os.path.join(os.getcwd(), app.config['UPLOAD_FOLDER'])
@@ -80,8 +82,27 @@ def create_app(config_name=None):
 
     # Create database tables
     from app.utils.database import Base, engine
-    from app.models.metadata import File, Metadata, AIAnalysis
+    from app.models.metadata import File, Metadata, AIAnalysis, ExtractionJob, DashboardStat
 
     Base.metadata.create_all(bind=engine)
 
+    # Apply columns and indexes added to existing tables
+    from app.utils.migrations import upgrade_schema, register_commands
+    upgrade_schema(engine)
+    register_commands(app)
+
+    # Full-text index over extracted text
+    from app.utils.search import ensure_search_index
+    ensure_search_index(engine)
+
+    # Build the dashboard counters on first start; they are maintained from then on
+    from app.utils.database import SessionLocal
+    from app.utils.stats import ensure_dashboard_stats
+
+    db = SessionLocal()
+    try:
+        ensure_dashboard_stats(db)
+    finally:
+        db.close()
+
     return app
\ No newline at end of file
@@ -11,12 +11,26 @@ class Config:
     MAX_CONTENT_LENGTH = 100 * 1024 * 1024  # 100 MB max upload
     ALLOWED_EXTENSIONS = {
         'image': {'png', 'jpg', 'jpeg', 'gif', 'bmp', 'tiff', 'webp'},
-        'document': {'pdf', 'docx', 'doc', 'txt', 'rtf', 'odt'},
+        'document': {'pdf', 'docx', 'doc', 'txt', 'rtf', 'odt', 'pptx'},
         'spreadsheet': {'xlsx', 'xls', 'csv', 'ods'},
         'audio': {'mp3', 'wav', 'ogg', 'flac', 'aac'},
         'video': {'mp4', 'avi', 'mov', 'mkv', 'webm'}
     }
 
+    # Metadata extraction worker processes
+    EXTRACTION_WORKERS = int(os.getenv('EXTRACTION_WORKERS', 2))
+    EXTRACTION_TIMEOUT = int(os.getenv('EXTRACTION_TIMEOUT', 30))  # Seconds before a worker is killed
+    EXTRACTION_QUEUE_DEPTH = int(os.getenv('EXTRACTION_QUEUE_DEPTH', 8))  # Extractions allowed to wait for a worker
+    EXTRACTION_MEMORY_LIMIT_MB = int(os.getenv('EXTRACTION_MEMORY_LIMIT_MB', 2048))  # 0 disables the limit
+    STEGANALYSIS_MAX_MEGAPIXELS = int(os.getenv('STEGANALYSIS_MAX_MEGAPIXELS', 0))  # Largest image analyzed; 0 derives it from the memory limit
+
+    # Background extraction jobs allowed to wait for a job thread
+    JOB_QUEUE_DEPTH = int(os.getenv('JOB_QUEUE_DEPTH', 100))
+
+    # Batch extraction limits
+    BATCH_MAX_FILES = int(os.getenv('BATCH_MAX_FILES', 500))
+    BATCH_MAX_UNCOMPRESSED_MB = int(os.getenv('BATCH_MAX_UNCOMPRESSED_MB', 1024))  # Total size unpacked from zip archives
+
 class DevelopmentConfig(Config):
     """Development configuration."""
     DEBUG = True
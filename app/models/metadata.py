@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, JSON, ForeignKey, Text, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, JSON, ForeignKey, Text, Boolean, Index, event
 from sqlalchemy.orm import relationship
 import datetime
 import json
@@ -11,21 +11,46 @@ class File(Base):
     id = Column(Integer, primary_key=True, index=True)
     filename = Column(String(255), nullable=False)
     original_filename = Column(String(255), nullable=False)
-    file_path = Column(String(512), nullable=False)
+    file_path = Column(String(512), nullable=False, index=True)  # Shared by files with identical contents
     file_size = Column(Integer, nullable=False)  # Size in bytes
-    mime_type = Column(String(255), nullable=False)
+    mime_type = Column(String(255), nullable=False, index=True)
     file_extension = Column(String(50), nullable=False)
     uploaded_at = Column(DateTime, default=datetime.datetime.utcnow)
+    content_hash = Column(String(64), nullable=True, index=True)  # SHA-256 of the file contents
+    sha1_hash = Column(String(40), nullable=True, index=True)
+    md5_hash = Column(String(32), nullable=True, index=True)
+    fuzzy_hash = Column(String(72), nullable=True)  # TLSH similarity hash, if available
 
     # Relationship with metadata
     file_metadata = relationship("Metadata", back_populates="file", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Newest-first listings and keyset pagination
+        Index("ix_files_uploaded_at_id", "uploaded_at", "id"),
+    )
+
+    def apply_hashes(self, hashes):
+        """Set the digest columns from a hashes dict (see app.utils.hashing)."""
+        self.content_hash = hashes.get('sha256')
+        self.sha1_hash = hashes.get('sha1')
+        self.md5_hash = hashes.get('md5')
+        self.fuzzy_hash = hashes.get('tlsh')
+
+    def get_hashes(self):
+        """Return the stored digests keyed by algorithm."""
+        return {
+            'sha256': self.content_hash,
+            'sha1': self.sha1_hash,
+            'md5': self.md5_hash,
+            'tlsh': self.fuzzy_hash
+        }
+
 class Metadata(Base):
     """Metadata model to store extracted metadata from files."""
     __tablename__ = "metadata"
 
     id = Column(Integer, primary_key=True, index=True)
-    file_id = Column(Integer, ForeignKey("files.id", ondelete="CASCADE"), nullable=False)
+    file_id = Column(Integer, ForeignKey("files.id", ondelete="CASCADE"), nullable=False, index=True)
     metadata_type = Column(String(50), nullable=False)  # e.g., 'image', 'document', 'audio'
     metadata_json = Column(JSON, nullable=False, default=dict)
     extracted_at = Column(DateTime, default=datetime.datetime.utcnow)
@@ -34,6 +59,14 @@ class Metadata(Base):
     # Plain text representation of extracted text content (if applicable)
     extracted_text = Column(Text, nullable=True)
 
+    # Frequently queried facts promoted out of metadata_json (see promote_fields)
+    image_width = Column(Integer, nullable=True)
+    image_height = Column(Integer, nullable=True)
+    captured_at = Column(DateTime, nullable=True, index=True)  # EXIF capture time
+    camera_model = Column(String(255), nullable=True, index=True)
+    has_gps = Column(Boolean, nullable=True, index=True)
+    stego_verdict = Column(String(20), nullable=True, index=True)
+
     # Relationship with file
     file = relationship("File", back_populates="file_metadata")
 
@@ -48,13 +81,61 @@ class Metadata(Base):
         """Set metadata from a Python dictionary."""
         self.metadata_json = metadata_dict
 
+    def promote_fields(self):
+        """Copy frequently queried facts from metadata_json into their indexed columns."""
+        metadata_dict = self.metadata_json if isinstance(self.metadata_json, dict) else {}
+
+        image_info = metadata_dict.get('image_info') or {}
+        self.image_width = _as_int(image_info.get('width'))
+        self.image_height = _as_int(image_info.get('height'))
+
+        exif = metadata_dict.get('exif') or {}
+        self.captured_at = None
+        for tag in ('DateTimeOriginal', 'DateTimeDigitized', 'DateTime'):
+            self.captured_at = _parse_exif_datetime(exif.get(tag))
+            if self.captured_at:
+                break
+
+        model = str(exif.get('Model') or '').strip()
+        self.camera_model = model[:255] or None
+
+        self.has_gps = bool(metadata_dict.get('gps_coordinates'))
+
+        summary = metadata_dict.get('steganography_summary') or {}
+        self.stego_verdict = summary.get('verdict')
+
+
+def _as_int(value):
+    """Convert a value to int, or None if it is not numeric."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_exif_datetime(value):
+    """Parse an EXIF 'YYYY:MM:DD HH:MM:SS' timestamp, or return None."""
+    if not value:
+        return None
+    try:
+        return datetime.datetime.strptime(str(value).strip()[:19], '%Y:%m:%d %H:%M:%S')
+    except ValueError:
+        return None
+
+
+@event.listens_for(Metadata, 'before_insert')
+@event.listens_for(Metadata, 'before_update')
+def _promote_metadata_fields(mapper, connection, target):
+    """Keep the promoted columns in step with metadata_json on every write."""
+    target.promote_fields()
+
 
 class AIAnalysis(Base):
     """AI Analysis model to store results from Gemini API analysis."""
     __tablename__ = "ai_analysis"
 
     id = Column(Integer, primary_key=True, index=True)
-    metadata_id = Column(Integer, ForeignKey("metadata.id", ondelete="CASCADE"), nullable=False)
+    metadata_id = Column(Integer, ForeignKey("metadata.id", ondelete="CASCADE"), nullable=False, index=True)
     analysis_json = Column(JSON, nullable=False, default=dict)  # Store the full analysis result
     has_anomalies = Column(Boolean, default=False)  # Quick flag for anomalies
     has_privacy_concerns = Column(Boolean, default=False)  # Quick flag for privacy concerns
@@ -62,4 +143,41 @@ class AIAnalysis(Base):
     analyzed_at = Column(DateTime, default=datetime.datetime.utcnow)
 
     # Relationship with metadata
-    metadata_rel = relationship("Metadata", back_populates="ai_analysis")
\ No newline at end of file
+    metadata_rel = relationship("Metadata", back_populates="ai_analysis")
+
+class ExtractionJob(Base):
+    """Extraction job model to track asynchronous metadata extraction requests."""
+    __tablename__ = "extraction_jobs"
+
+    id = Column(String(32), primary_key=True)  # Random hex ID handed to the client
+    status = Column(String(20), nullable=False, default="queued")  # queued, running, completed, failed
+    stage = Column(String(20), nullable=False, default="queued")  # Current pipeline stage
+    progress = Column(Integer, nullable=False, default=0)  # Percentage complete
+    profile = Column(String(20), nullable=False)
+
+    # Uploaded file details, kept until the File record is created
+    original_filename = Column(String(255), nullable=False)
+    safe_filename = Column(String(255), nullable=False)
+    file_path = Column(String(512), nullable=False)
+    file_size = Column(Integer, nullable=False)
+    mime_type = Column(String(255), nullable=False)
+    file_extension = Column(String(50), nullable=False)
+    content_hash = Column(String(64), nullable=True)
+    file_hashes = Column(JSON, nullable=True)  # All digests, see app.utils.hashing
+
+    owner = Column(String(128), nullable=True, index=True)  # host:pid:token of the process running the job
+    stage_timings = Column(JSON, nullable=False, default=dict)  # Stage name -> duration in ms
+    error = Column(Text, nullable=True)
+    file_id = Column(Integer, ForeignKey("files.id", ondelete="SET NULL"), nullable=True)
+
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+
+class DashboardStat(Base):
+    """Running catalog counter, kept up to date as files and metadata are added or removed."""
+    __tablename__ = "dashboard_stats"
+
+    name = Column(String(50), primary_key=True)  # e.g. 'files', 'files_image', 'suspicious_files'
+    value = Column(Integer, nullable=False, default=0)
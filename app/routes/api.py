@@ -1,17 +1,29 @@
-from flask import Blueprint, request, jsonify, current_app, send_file
+from flask import Blueprint, request, jsonify, current_app, send_file, Response, stream_with_context
 import os
 import tempfile
+import shutil
 import logging
-from app.utils.file_utils import allowed_file, save_uploaded_file, CustomJSONEncoder
-from app.utils.extractors import extract_metadata
+import time
+from app.utils.file_utils import allowed_file, ingest_upload, store_local_file, release_claim, resolve_stored_path, CustomJSONEncoder
+from app.utils.dedup import find_duplicate, find_duplicates, remove_unreferenced_file
+from app.utils.extraction_pool import get_extraction_pool, timeout_metadata, ExtractionPoolBusy, ExtractionTimeout, ExtractionFailed
+from app.utils.extractors import extract_metadata, EXTRACTION_PROFILES, STANDARD_PROFILE, FORENSIC_PROFILE
 from app.utils.ai_analysis import analyze_metadata, generate_report
 from app.utils.metadata_cleaner import clean_metadata
-from app.models.metadata import File, Metadata, AIAnalysis
-from app.utils.database import get_db
+from app.models.metadata import File, Metadata, AIAnalysis, ExtractionJob
+from app.utils.database import get_db, get_pool_status, SessionLocal
+from app.utils.jobs import submit_extraction_job, job_status, JobQueueFull
+from app.utils.pagination import parse_file_filters, parse_page_size, parse_fields, paginate_files, file_fields
+from app.utils.search import search_extracted_text, DEFAULT_SEARCH_LIMIT, MAX_SEARCH_LIMIT
+from app.utils.batch import save_batch_uploads, extract_batch, store_batch, remove_batch_files, release_batch_claims
+from sqlalchemy import select
 import json
 
 api_bp = Blueprint('api', __name__)
 
+# Rows fetched per round trip when streaming exports
+EXPORT_BATCH_SIZE = 500
+
 @api_bp.route('/extract', methods=['POST'])
 def extract():
     """
@@ -36,24 +48,81 @@ def extract():
             'error': 'No file selected'
         }), 400
 
+    # Extraction profile: fast, standard or forensic
+    profile = request.form.get('profile', STANDARD_PROFILE).lower()
+    if profile not in EXTRACTION_PROFILES:
+        return jsonify({
+            'success': False,
+            'error': f"Unsupported profile '{profile}'. Use one of: {', '.join(EXTRACTION_PROFILES)}"
+        }), 400
+
     # Check if the file has an allowed extension
     if file and allowed_file(file.filename):
         try:
-            # Save the uploaded file
-            file_path, original_filename, safe_filename, file_size, mime_type = save_uploaded_file(file)
+            # Save the uploaded file, hashing and sniffing it as it is written
+            stored = ingest_upload(file)
+            file_path, original_filename, safe_filename = stored['file_path'], stored['original_filename'], stored['safe_filename']
+            file_size, mime_type, content_hash = stored['file_size'], stored['mime_type'], stored['content_hash']
+
+            # Reuse an earlier extraction of identical contents
+            db = get_db()
+            duplicate = find_duplicate(db, content_hash, profile)
+            if duplicate:
+                existing_file, existing_metadata = duplicate
+                # The new copy is only kept if it landed on the existing record's path
+                release_claim(stored)
+                remove_unreferenced_file(db, file_path)
+                return jsonify({
+                    'success': True,
+                    'filename': original_filename,
+                    'file_size': file_size,
+                    'mime_type': mime_type,
+                    'profile': profile,
+                    'metadata': existing_metadata.metadata_json,
+                    'file_id': existing_file.id,
+                    'duplicate': True
+                })
 
             # Get file extension
             file_extension = os.path.splitext(original_filename)[1].lower().lstrip('.')
 
-            # Extract metadata
-            metadata_dict = extract_metadata(file_path)
+            # End the duplicate lookup's read transaction so it does not
+            # stay open while the request waits on the worker
+            db.commit()
+
+            # Extract metadata in a worker process; a worker that runs past
+            # the timeout is killed and replaced
+            pool = get_extraction_pool()
+            try:
+                metadata_dict = pool.extract(file_path, profile, mime_type)
+            except ExtractionPoolBusy as e:
+                # Push back on the client rather than queueing unbounded work
+                release_claim(stored)
+                remove_unreferenced_file(db, file_path)
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 429
+            except ExtractionTimeout:
+                # Proceed with minimal metadata
+                logging.warning(f"Metadata extraction timed out for file: {original_filename}")
+                metadata_dict = timeout_metadata(file_size, mime_type, file_extension, pool.timeout)
+            except ExtractionFailed as e:
+                # The extractor raised or its worker died; nothing is stored
+                release_claim(stored)
+                remove_unreferenced_file(db, file_path)
+                return jsonify({
+                    'success': False,
+                    'error': f"Metadata could not be extracted: {str(e)}"
+                }), 422
+            if profile == FORENSIC_PROFILE:
+                metadata_dict['file_hashes'] = stored['hashes']
 
             # Store file and metadata in database if 'store' parameter is true
             store_in_db = request.form.get('store', 'false').lower() == 'true'
             file_id = None
 
             if store_in_db:
-                db = next(get_db())
 
                 # Create file record
                 db_file = File(
@@ -64,6 +133,7 @@ def extract():
                     mime_type=mime_type,
                     file_extension=file_extension
                 )
+                db_file.apply_hashes(stored['hashes'])
                 db.add(db_file)
                 db.flush()  # Get the file ID
 
@@ -91,6 +161,9 @@ def extract():
                 db.commit()
                 file_id = db_file.id
 
+            # Recorded, or not being kept: either way the upload is done with the file
+            release_claim(stored)
+
             # Return the extracted metadata
             # Use the safe version of metadata that we've already converted
             if store_in_db:
@@ -105,6 +178,7 @@ def extract():
                 'filename': original_filename,
                 'file_size': file_size,
                 'mime_type': mime_type,
+                'profile': profile,
                 'metadata': safe_metadata
             }
 
@@ -124,35 +198,425 @@ def extract():
             'error': 'File type not allowed'
         }), 400
 
+@api_bp.route('/extract/batch', methods=['POST'])
+def extract_batch_files():
+    """
+    API endpoint to extract metadata from many files in one request.
+
+    Accepts any number of 'files' (zip archives are unpacked) and streams one
+    JSON line per file as its extraction completes, followed by a summary line.
+    With store=true all rows are inserted in a single transaction at the end.
+
+    Returns:
+        NDJSON response with per-file results
+    """
+    uploads = request.files.getlist('files') + request.files.getlist('file')
+    if not uploads:
+        return jsonify({
+            'success': False,
+            'error': 'No files in the request'
+        }), 400
+
+    profile = request.form.get('profile', STANDARD_PROFILE).lower()
+    if profile not in EXTRACTION_PROFILES:
+        return jsonify({
+            'success': False,
+            'error': f"Unsupported profile '{profile}'. Use one of: {', '.join(EXTRACTION_PROFILES)}"
+        }), 400
+
+    store_in_db = request.form.get('store', 'false').lower() == 'true'
+
+    try:
+        entries, rejected = save_batch_uploads(uploads)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        logging.error(f"Error saving batch uploads: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+    if not entries:
+        return jsonify({
+            'success': False,
+            'error': 'No files with an allowed type in the request',
+            'rejected': rejected
+        }), 400
+
+    # Files whose contents were already extracted with this profile are not extracted again
+    duplicates = {}
+    matches = find_duplicates(get_db(), [entry['content_hash'] for entry in entries], profile)
+    for index, entry in enumerate(entries):
+        if entry['content_hash'] in matches:
+            existing_file, existing_metadata = matches[entry['content_hash']]
+            duplicates[index] = (existing_file.id, existing_metadata.metadata_json)
+
+    def generate():
+        results = {}
+        stored = False
+        try:
+            for item in rejected:
+                yield json.dumps({'success': False, **item}) + '\n'
+
+            for index, (file_id, metadata_json) in duplicates.items():
+                entry = entries[index]
+                yield json.dumps({
+                    'index': index,
+                    'filename': entry['filename'],
+                    'file_size': entry['file_size'],
+                    'mime_type': entry['mime_type'],
+                    'success': True,
+                    'metadata': metadata_json,
+                    'file_id': file_id,
+                    'duplicate': True
+                }) + '\n'
+
+            pending = [index for index in range(len(entries)) if index not in duplicates]
+            for index, metadata_dict, error in extract_batch(entries, profile, pending):
+                entry = entries[index]
+                line = {
+                    'index': index,
+                    'filename': entry['filename'],
+                    'file_size': entry['file_size'],
+                    'mime_type': entry['mime_type']
+                }
+                if error is None:
+                    results[index] = metadata_dict
+                    line.update(success=True, metadata=metadata_dict)
+                else:
+                    line.update(success=False, error=error)
+                yield json.dumps(line, cls=CustomJSONEncoder) + '\n'
+
+            summary = {
+                'summary': True,
+                'profile': profile,
+                'total': len(entries) + len(rejected),
+                'succeeded': len(results) + len(duplicates),
+                'failed': len(entries) - len(results) - len(duplicates) + len(rejected),
+                'duplicates': len(duplicates)
+            }
+            if duplicates:
+                summary['file_ids'] = {str(index): file_id for index, (file_id, _) in duplicates.items()}
+
+            if store_in_db and results:
+                db = SessionLocal()
+                try:
+                    file_ids = store_batch(db, entries, results)
+                    summary['stored'] = len(file_ids)
+                    summary.setdefault('file_ids', {}).update(
+                        {str(index): file_id for index, file_id in file_ids.items()}
+                    )
+                    stored = True
+                except Exception as e:
+                    logging.error(f"Error storing batch results: {str(e)}")
+                    summary['store_error'] = str(e)
+                finally:
+                    db.close()
+
+            yield json.dumps(summary) + '\n'
+        finally:
+            # Stored rows are committed by now, so no file needs its claim
+            release_batch_claims(entries)
+            # Files are only kept when their metadata was stored; contents shared
+            # with existing records are left in place
+            if stored:
+                remove_batch_files([entry for index, entry in enumerate(entries) if index not in results])
+            else:
+                remove_batch_files(entries)
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@api_bp.route('/jobs', methods=['POST'])
+def create_job():
+    """
+    API endpoint to queue metadata extraction for an uploaded file.
+
+    The file is saved and the job recorded before returning; extraction runs
+    in the background and its progress is reported by GET /api/jobs/<job_id>.
+
+    Returns:
+        JSON response with the job ID and status URL
+    """
+    if 'file' not in request.files:
+        return jsonify({
+            'success': False,
+            'error': 'No file part in the request'
+        }), 400
+
+    file = request.files['file']
+
+    if file.filename == '':
+        return jsonify({
+            'success': False,
+            'error': 'No file selected'
+        }), 400
+
+    profile = request.form.get('profile', STANDARD_PROFILE).lower()
+    if profile not in EXTRACTION_PROFILES:
+        return jsonify({
+            'success': False,
+            'error': f"Unsupported profile '{profile}'. Use one of: {', '.join(EXTRACTION_PROFILES)}"
+        }), 400
+
+    if not allowed_file(file.filename):
+        return jsonify({
+            'success': False,
+            'error': 'File type not allowed'
+        }), 400
+
+    try:
+        start_time = time.time()
+        stored = ingest_upload(file)
+        file_extension = os.path.splitext(stored['original_filename'])[1].lower().lstrip('.')
+        upload_ms = int((time.time() - start_time) * 1000)
+
+        db = get_db()
+        try:
+            job = submit_extraction_job(
+                db, stored['file_path'], stored['original_filename'], stored['safe_filename'], stored['file_size'],
+                stored['mime_type'], file_extension, profile, upload_ms, stored['hashes']
+            )
+        except JobQueueFull as e:
+            # Push back on the client rather than queueing unbounded work
+            release_claim(stored)
+            remove_unreferenced_file(db, stored['file_path'])
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 429
+        # The queued job now keeps the file
+        release_claim(stored)
+
+        return jsonify({
+            'success': True,
+            'job_id': job.id,
+            'status': job.status,
+            'status_url': f'/api/jobs/{job.id}'
+        }), 202
+
+    except Exception as e:
+        logging.error(f"Error creating extraction job: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@api_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """
+    API endpoint to get the status of an extraction job.
+
+    Args:
+        job_id (str): Job ID
+
+    Returns:
+        JSON response with job status, progress and stage timings
+    """
+    try:
+        db = get_db()
+        job = db.query(ExtractionJob).filter(ExtractionJob.id == job_id).first()
+
+        if not job:
+            return jsonify({
+                'success': False,
+                'error': 'Job not found'
+            }), 404
+
+        response = {
+            'success': True,
+            'job': job_status(job)
+        }
+
+        if job.file_id:
+            response['result_url'] = f'/api/files/{job.file_id}'
+
+        return jsonify(response)
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @api_bp.route('/files', methods=['GET'])
 def get_files():
     """
-    API endpoint to get list of files with extracted metadata.
+    API endpoint to get a page of files, newest first.
+
+    Query parameters:
+        cursor (str): next_cursor from the previous page
+        limit (int): Files per page (default 50, max 500)
+        fields (str): Comma-separated fields to return
+        mime, ext, min_size, max_size, uploaded_after, uploaded_before: Filters
 
     Returns:
-        JSON response with file list
+        JSON response with file list and the cursor for the next page
     """
     try:
-        db = next(get_db())
-        files = db.query(File).order_by(File.uploaded_at.desc()).all()
+        filters = parse_file_filters(request.args)
+        limit = parse_page_size(request.args)
+        fields = parse_fields(request.args.get('fields'))
 
-        file_list = []
-        for file in files:
-            file_list.append({
-                'id': file.id,
-                'filename': file.original_filename,
-                'file_size': file.file_size,
-                'mime_type': file.mime_type,
-                'uploaded_at': file.uploaded_at.isoformat() if file.uploaded_at else None
-            })
+        db = get_db()
+        files, next_cursor = paginate_files(db, filters, request.args.get('cursor'), limit, fields)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+    file_list = [file_fields(file, fields) for file in files]
+
+    return jsonify({
+        'success': True,
+        'count': len(file_list),
+        'files': file_list,
+        'next_cursor': next_cursor
+    })
+
+def _file_record(file):
+    """Serialize a File row for API responses."""
+    return {
+        'id': file.id,
+        'filename': file.original_filename,
+        'file_size': file.file_size,
+        'mime_type': file.mime_type,
+        'file_extension': file.file_extension,
+        'uploaded_at': file.uploaded_at.isoformat() if file.uploaded_at else None,
+        'hashes': file.get_hashes()
+    }
+
+def _metadata_record(metadata):
+    """Serialize a Metadata row for API responses."""
+    record = {
+        'type': metadata.metadata_type,
+        'extraction_duration': metadata.extraction_duration,
+        'extracted_at': metadata.extracted_at.isoformat() if metadata.extracted_at else None,
+        'data': metadata.metadata_json
+    }
+
+    if metadata.extracted_text:
+        record['text_preview'] = metadata.extracted_text
+
+    return record
+
+def _analysis_record(analysis):
+    """Serialize an AIAnalysis row for API responses."""
+    return {
+        'has_anomalies': analysis.has_anomalies,
+        'has_privacy_concerns': analysis.has_privacy_concerns,
+        'summary': analysis.summary,
+        'analyzed_at': analysis.analyzed_at.isoformat() if analysis.analyzed_at else None,
+        'data': analysis.analysis_json
+    }
+
+@api_bp.route('/files/export', methods=['GET'])
+def export_files():
+    """
+    API endpoint to export every file as newline-delimited JSON.
+
+    Rows are read in batches from a streaming cursor and written out as they
+    arrive, so memory use does not grow with the number of files.
+
+    Query parameters:
+        metadata (bool): Include each file's extracted metadata
+        analysis (bool): Include each file's AI analysis (implies metadata rows are joined)
+
+    Returns:
+        NDJSON response with one file per line
+    """
+    include_metadata = request.args.get('metadata', 'false').lower() == 'true'
+    include_analysis = request.args.get('analysis', 'false').lower() == 'true'
+
+    def generate():
+        db = SessionLocal()
+        try:
+            entities = [File]
+            if include_metadata or include_analysis:
+                entities.append(Metadata)
+            if include_analysis:
+                entities.append(AIAnalysis)
+
+            stmt = select(*entities)
+            if len(entities) > 1:
+                stmt = stmt.outerjoin(Metadata, Metadata.file_id == File.id)
+            if include_analysis:
+                stmt = stmt.outerjoin(AIAnalysis, AIAnalysis.metadata_id == Metadata.id)
+            # Same metadata row as /api/files/<id>: the first one for each file
+            stmt = stmt.order_by(File.id, *([Metadata.id] if len(entities) > 1 else []))
+
+            rows = db.execute(stmt, execution_options={'yield_per': EXPORT_BATCH_SIZE})
+
+            last_file_id = None
+            for row in rows:
+                file = row[0]
+                if file.id == last_file_id:
+                    continue
+                last_file_id = file.id
+
+                record = _file_record(file)
+                if include_metadata and row[1] is not None:
+                    record['metadata'] = _metadata_record(row[1])
+                if include_analysis and row[2] is not None:
+                    record['ai_analysis'] = _analysis_record(row[2])
+
+                yield json.dumps(record, cls=CustomJSONEncoder) + '\n'
+        finally:
+            db.close()
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@api_bp.route('/search', methods=['GET'])
+def search():
+    """
+    API endpoint to search the text extracted from files.
+
+    Query parameters:
+        q (str): Search terms; all must match, 'term*' matches a prefix
+        limit (int): Maximum results (default 20, max 100)
+        offset (int): Results to skip
+
+    Returns:
+        JSON response with ranked results and highlighted snippets
+    """
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({
+            'success': False,
+            'error': "Missing search query 'q'"
+        }), 400
+
+    try:
+        limit = min(max(int(request.args.get('limit', DEFAULT_SEARCH_LIMIT)), 1), MAX_SEARCH_LIMIT)
+        offset = max(int(request.args.get('offset', 0)), 0)
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'error': "'limit' and 'offset' must be integers"
+        }), 400
+
+    try:
+        db = get_db()
+        results = search_extracted_text(db, query, limit, offset)
 
         return jsonify({
             'success': True,
-            'count': len(file_list),
-            'files': file_list
+            'query': query,
+            'count': len(results),
+            'results': results
         })
 
     except Exception as e:
+        logging.error(f"Error searching extracted text: {str(e)}")
         return jsonify({
             'success': False,
             'error': str(e)
@@ -170,7 +634,7 @@ def get_file_metadata(file_id):
         JSON response with file metadata
     """
     try:
-        db = next(get_db())
+        db = get_db()
         file = db.query(File).filter(File.id == file_id).first()
 
         if not file:
@@ -183,36 +647,15 @@ def get_file_metadata(file_id):
 
         response = {
             'success': True,
-            'file': {
-                'id': file.id,
-                'filename': file.original_filename,
-                'file_size': file.file_size,
-                'mime_type': file.mime_type,
-                'file_extension': file.file_extension,
-                'uploaded_at': file.uploaded_at.isoformat() if file.uploaded_at else None
-            }
+            'file': _file_record(file)
         }
 
         if metadata:
-            response['metadata'] = {
-                'type': metadata.metadata_type,
-                'extraction_duration': metadata.extraction_duration,
-                'extracted_at': metadata.extracted_at.isoformat() if metadata.extracted_at else None,
-                'data': metadata.metadata_json
-            }
-
-            if metadata.extracted_text:
-                response['metadata']['text_preview'] = metadata.extracted_text
+            response['metadata'] = _metadata_record(metadata)
 
             # Include AI analysis if available
             if metadata.ai_analysis:
-                response['ai_analysis'] = {
-                    'has_anomalies': metadata.ai_analysis.has_anomalies,
-                    'has_privacy_concerns': metadata.ai_analysis.has_privacy_concerns,
-                    'summary': metadata.ai_analysis.summary,
-                    'analyzed_at': metadata.ai_analysis.analyzed_at.isoformat() if metadata.ai_analysis.analyzed_at else None,
-                    'data': metadata.ai_analysis.analysis_json
-                }
+                response['ai_analysis'] = _analysis_record(metadata.ai_analysis)
 
         return jsonify(response)
 
@@ -235,7 +678,7 @@ def analyze_file(file_id):
         JSON response with analysis results
     """
     try:
-        db = next(get_db())
+        db = get_db()
         file = db.query(File).filter(File.id == file_id).first()
 
         if not file:
@@ -349,7 +792,7 @@ def generate_file_report(file_id):
         HTML report or JSON error
     """
     try:
-        db = next(get_db())
+        db = get_db()
         file = db.query(File).filter(File.id == file_id).first()
 
         if not file:
@@ -455,7 +898,7 @@ def delete_file(file_id):
         JSON response indicating success or failure
     """
     try:
-        db = next(get_db())
+        db = get_db()
         file = db.query(File).filter(File.id == file_id).first()
 
         if not file:
@@ -464,14 +907,15 @@ def delete_file(file_id):
                 'error': 'File not found'
             }), 404
 
-        # Delete the physical file
-        if os.path.exists(file.file_path):
-            os.remove(file.file_path)
+        file_path = file.file_path
 
         # Delete from database (cascade will delete metadata)
         db.delete(file)
         db.commit()
 
+        # Delete the physical file unless another record shares its contents
+        remove_unreferenced_file(db, file_path)
+
         return jsonify({
             'success': True,
             'message': f'File {file.original_filename} deleted successfully'
@@ -496,7 +940,7 @@ def clean_file_metadata(file_id):
         JSON response with cleaning results
     """
     try:
-        db = next(get_db())
+        db = get_db()
         file = db.query(File).filter(File.id == file_id).first()
 
         if not file:
@@ -506,29 +950,49 @@ def clean_file_metadata(file_id):
             }), 404
 
         # Check if file exists on disk
-        if not os.path.exists(file.file_path):
+        stored_path = resolve_stored_path(file.file_path, file.content_hash)
+        if not os.path.exists(stored_path):
             return jsonify({
                 'success': False,
                 'error': 'File not found on disk'
             }), 404
 
-        # Clean metadata from the file
-        success, message, cleaned_file_path = clean_metadata(file.file_path)
+        # Stored contents may be shared with other records, so clean a copy
+        # and store the result as new content
+        extension = os.path.splitext(stored_path)[1]
+        fd, work_path = tempfile.mkstemp(suffix=extension)
+        os.close(fd)
+        try:
+            shutil.copyfile(stored_path, work_path)
+            success, message, cleaned_file_path = clean_metadata(work_path)
 
-        if not success:
-            return jsonify({
-                'success': False,
-                'error': message
-            }), 400
+            if not success:
+                return jsonify({
+                    'success': False,
+                    'error': message
+                }), 400
+
+            old_path = file.file_path
+            stored = store_local_file(work_path, extension.lstrip('.') or None)
+            file.file_path, file.file_size = stored['file_path'], stored['file_size']
+            file.apply_hashes(stored['hashes'])
+            file.filename = os.path.basename(file.file_path)
+            db.commit()
+            release_claim(stored)
+        finally:
+            os.remove(work_path)
+
+        if old_path != file.file_path:
+            remove_unreferenced_file(db, old_path)
 
         # Re-extract metadata to update the database
-        metadata_dict = extract_metadata(file.file_path)
+        metadata_dict = extract_metadata(file.file_path, mime_type=file.mime_type)
 
         # Update the metadata in the database
         metadata = db.query(Metadata).filter(Metadata.file_id == file_id).first()
         if metadata:
-            # Update existing metadata
-            metadata.metadata_json = metadata_dict
+            # Update existing metadata, serialized like a fresh extraction
+            metadata.metadata_json = json.loads(json.dumps(metadata_dict, cls=CustomJSONEncoder))
             db.commit()
 
         return jsonify({
@@ -542,4 +1006,17 @@ def clean_file_metadata(file_id):
         return jsonify({
             'success': False,
             'error': str(e)
-        }), 500
\ No newline at end of file
+        }), 500
+
+@api_bp.route('/metrics/db', methods=['GET'])
+def database_metrics():
+    """
+    API endpoint to report database connection pool usage.
+
+    Returns:
+        JSON response with pool metrics
+    """
+    return jsonify({
+        'success': True,
+        'pool': get_pool_status()
+    })
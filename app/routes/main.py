@@ -1,16 +1,17 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, send_from_directory, abort
 from werkzeug.utils import secure_filename
 import os
-from app.utils.file_utils import allowed_file, save_uploaded_file, calculate_file_hash, CustomJSONEncoder
-from app.utils.extractors import extract_metadata
+from app.utils.file_utils import allowed_file, ingest_upload, release_claim, resolve_stored_path, CustomJSONEncoder
+from app.utils.dedup import find_duplicate, remove_unreferenced_file
+from app.utils.extraction_pool import get_extraction_pool, timeout_metadata, ExtractionPoolBusy, ExtractionTimeout, ExtractionFailed
 from app.models.metadata import File, Metadata, AIAnalysis
 from app.utils.database import get_db
+from app.utils.pagination import parse_file_filters, parse_page_size, paginate_files
+from app.utils.stats import get_dashboard_stats, FILE_CATEGORIES, FILES, TOTAL_BYTES, METADATA_RECORDS, SUSPICIOUS_FILES
 from sqlalchemy.orm import Session
+from sqlalchemy import func
 import logging
 import json
-import threading
-import queue
-import time
 
 main_bp = Blueprint('main', __name__)
 
@@ -18,37 +19,19 @@ main_bp = Blueprint('main', __name__)
 def index():
     """Home page route."""
     # Get database session
-    db = next(get_db())
+    db = get_db()
 
     # Get most recent 3 files
     recent_files = db.query(File).order_by(File.uploaded_at.desc()).limit(3).all()
 
-    # Get statistics for dashboard
-    files_count = db.query(File).count()
-    images_count = db.query(File).filter(File.mime_type.like('image/%')).count()
-    docs_count = db.query(File).filter(
-        (File.mime_type == 'application/pdf') |
-        (File.mime_type.like('application/vnd.openxmlformats-officedocument.%')) |
-        (File.mime_type.like('text/%'))
-    ).count()
-
-    # Count security alerts - files with steganography potential
-    security_alerts = 0
-    for file in db.query(File).all():
-        metadata = db.query(Metadata).filter_by(file_id=file.id).first()
-        if metadata and metadata.metadata_json:
-            try:
-                metadata_dict = metadata.metadata_json
-                # Check for steganography analysis results
-                if metadata_dict.get('steganography_analysis'):
-                    analysis = metadata_dict['steganography_analysis']
-                    # Check if any analysis returned concerning values
-                    if analysis.get('lsb_analysis', {}).get('suspicious', False) or \
-                       analysis.get('chi_square_analysis', {}).get('suspicious', False) or \
-                       analysis.get('sample_pair_analysis', {}).get('suspicious', False):
-                        security_alerts += 1
-            except Exception:
-                pass
+    # Dashboard statistics are maintained counters, not catalog scans
+    stats = get_dashboard_stats(db)
+    files_count = stats[FILES]
+    images_count = stats['files_image']
+    docs_count = stats['files_document'] + stats['files_spreadsheet']
+
+    # Files whose steganalysis verdict was suspicious
+    security_alerts = stats[SUSPICIOUS_FILES]
 
     return render_template('index.html',
                           recent_files=recent_files,
@@ -59,7 +42,7 @@ def index():
 
 @main_bp.route('/upload', methods=['GET', 'POST'])
 def upload_file():
-    """File upload route with timeout protection."""
+    """File upload route; extraction runs in the worker pool with a hard timeout."""
     if request.method == 'POST':
         # Check if the post request has the file part
         if 'file' not in request.files:
@@ -75,81 +58,61 @@ def upload_file():
 
         # Check if the file has an allowed extension
         if file and allowed_file(file.filename):
+            stored = None
             try:
-                # Save the uploaded file
-                file_path, original_filename, safe_filename, file_size, mime_type = save_uploaded_file(file)
+                # Save the uploaded file; its hash is computed while it is written
+                stored = ingest_upload(file)
+                file_path, original_filename, safe_filename = stored['file_path'], stored['original_filename'], stored['safe_filename']
+                file_size, mime_type, file_hash = stored['file_size'], stored['mime_type'], stored['content_hash']
+                logging.info(f"Calculated file hash: {file_hash}")
 
                 # Get file extension
                 file_extension = os.path.splitext(original_filename)[1].lower().lstrip('.')
 
-                # Calculate file hash
-                file_hash = calculate_file_hash(file_path)
-                logging.info(f"Calculated file hash: {file_hash}")
+                # Identical contents were already analyzed; show that record instead
+                db = get_db()
+                duplicate = find_duplicate(db, file_hash)
+                if duplicate:
+                    existing_file, _ = duplicate
+                    logging.info(f"Upload {original_filename} duplicates file {existing_file.id}, reusing its metadata")
+                    # The new copy is only kept if it landed on the existing record's path
+                    release_claim(stored)
+                    remove_unreferenced_file(db, file_path)
+                    flash(f'This file was already analyzed as "{existing_file.original_filename}". Showing the existing results.', 'info')
+                    return redirect(url_for('main.file_details', file_id=existing_file.id))
+
+                # End the duplicate lookup's read transaction so it does not
+                # stay open while the request waits on the worker
+                db.commit()
 
-                # Extract metadata with timeout
-                result_queue = queue.Queue()
-
-                def extract_with_timeout():
-                    try:
-                        metadata = extract_metadata(file_path)
-                        # Add file hash to metadata
-                        metadata['hash'] = file_hash
-                        result_queue.put(('success', metadata))
-                    except Exception as e:
-                        logging.error(f"Error in metadata extraction thread: {str(e)}")
-                        result_queue.put(('error', str(e)))
-
-                # Start metadata extraction in a separate thread
-                extraction_thread = threading.Thread(target=extract_with_timeout)
-                extraction_thread.daemon = True
-                extraction_thread.start()
-
-                # Wait for the extraction to complete with a timeout
-                MAX_WAIT_TIME = 30  # Maximum 30 seconds wait time
-                extraction_thread.join(MAX_WAIT_TIME)
-
-                metadata_dict = None
-                if extraction_thread.is_alive():
-                    # If thread is still running after timeout, proceed with minimal metadata
+                # Extract metadata in a worker process; a worker that runs past
+                # the timeout is killed and replaced
+                pool = get_extraction_pool()
+                try:
+                    metadata_dict = pool.extract(file_path, mime_type=mime_type)
+                    # Add file hash to metadata
+                    metadata_dict['hash'] = file_hash
+                except ExtractionPoolBusy:
+                    # Push back on the client rather than queueing unbounded work
+                    logging.warning(f"Extraction pool busy, rejecting upload: {original_filename}")
+                    release_claim(stored)
+                    remove_unreferenced_file(db, file_path)
+                    flash('The server is busy processing other files. Please try again in a moment.', 'warning')
+                    return redirect(request.url)
+                except ExtractionTimeout:
+                    # Proceed with minimal metadata
                     logging.warning(f"Metadata extraction timed out for file: {original_filename}")
-                    metadata_dict = {
-                        "extracted_by": "BasicFileInfo",
-                        "file_info": {
-                            "file_size": file_size,
-                            "mime_type": mime_type,
-                            "extension": file_extension,
-                            "hash": file_hash
-                        },
-                        "extraction_duration": MAX_WAIT_TIME * 1000,
-                        "extraction_status": "timeout",
-                        "warning": "Metadata extraction timed out, only basic information is available"
-                    }
-                else:
-                    # Get the result from the queue
-                    try:
-                        status, result = result_queue.get(block=False)
-                        if status == 'success':
-                            metadata_dict = result
-                        else:
-                            raise Exception(result)
-                    except queue.Empty:
-                        # This shouldn't happen if the thread completed
-                        logging.error("Thread completed but no result in queue")
-                        metadata_dict = {
-                            "extracted_by": "BasicFileInfo",
-                            "file_info": {
-                                "file_size": file_size,
-                                "mime_type": mime_type,
-                                "extension": file_extension,
-                                "hash": file_hash
-                            },
-                            "extraction_status": "error",
-                            "error": "Unknown error in metadata extraction"
-                        }
+                    metadata_dict = timeout_metadata(file_size, mime_type, file_extension, pool.timeout)
+                    metadata_dict['file_info']['hash'] = file_hash
+                except ExtractionFailed as e:
+                    # The extractor raised or its worker died; nothing is stored
+                    logging.error(f"Metadata extraction failed for file {original_filename}: {str(e)}")
+                    release_claim(stored)
+                    remove_unreferenced_file(db, file_path)
+                    flash(f'Metadata could not be extracted from this file: {str(e)}', 'error')
+                    return redirect(request.url)
 
                 # Store file and metadata in database
-                db = next(get_db())
-
                 # Create file record
                 db_file = File(
                     filename=safe_filename,
@@ -159,6 +122,7 @@ def upload_file():
                     mime_type=mime_type,
                     file_extension=file_extension
                 )
+                db_file.apply_hashes(stored['hashes'])
                 db.add(db_file)
                 db.flush()  # Get the file ID
 
@@ -192,6 +156,7 @@ def upload_file():
 
                 db.add(db_metadata)
                 db.commit()
+                release_claim(stored)
 
                 # Check if extraction timed out
                 if metadata_dict.get('extraction_status') == 'timeout':
@@ -204,6 +169,10 @@ def upload_file():
 
             except Exception as e:
                 logging.error(f"Error processing upload: {str(e)}")
+                if stored:
+                    # Don't keep a copy nothing was recorded for
+                    release_claim(stored)
+                    remove_unreferenced_file(get_db(), stored['file_path'])
                 flash(f'Error processing file: {str(e)}', 'error')
                 return redirect(request.url)
         else:
@@ -214,15 +183,38 @@ def upload_file():
 
 @main_bp.route('/files')
 def file_list():
-    """List all files with extracted metadata."""
-    db = next(get_db())
-    files = db.query(File).order_by(File.uploaded_at.desc()).all()
-    return render_template('file_list.html', files=files)
+    """List one page of files, newest first, with optional filters."""
+    db = get_db()
+
+    try:
+        filters = parse_file_filters(request.args)
+        limit = parse_page_size(request.args)
+        files, next_cursor = paginate_files(db, filters, request.args.get('cursor'), limit)
+    except ValueError as e:
+        flash(str(e), 'error')
+        return redirect(url_for('main.file_list'))
+
+    # Catalog-wide figures come from the maintained counters, not the current page
+    counters = get_dashboard_stats(db)
+    stats = {
+        'type_counts': {category: counters[f'files_{category}'] for category in FILE_CATEGORIES},
+        'total_files': counters[FILES],
+        'total_size': counters[TOTAL_BYTES],
+        'files_with_metadata': counters[METADATA_RECORDS],
+        'last_upload': db.query(func.max(File.uploaded_at)).scalar()
+    }
+
+    # Carry the filters into the pagination links
+    page_args = {key: value for key, value in request.args.items() if key != 'cursor' and value}
+
+    return render_template('file_list.html', files=files, stats=stats,
+                           next_cursor=next_cursor, page_args=page_args,
+                           is_first_page=not request.args.get('cursor'))
 
 @main_bp.route('/files/<int:file_id>')
 def file_details(file_id):
     """Display file details and extracted metadata."""
-    db = next(get_db())
+    db = get_db()
     file = db.query(File).filter(File.id == file_id).first()
     if file is None:
         abort(404)
@@ -264,14 +256,15 @@ def file_details(file_id):
 @main_bp.route('/download/<int:file_id>')
 def download_file(file_id):
     """Download the original file."""
-    db = next(get_db())
+    db = get_db()
     file = db.query(File).filter(File.id == file_id).first()
     if file is None:
         abort(404)
 
-    # Get the directory and filename
-    directory = os.path.dirname(file.file_path)
-    filename = os.path.basename(file.file_path)
+    # Get the directory and filename, wherever the upload layout put it
+    file_path = resolve_stored_path(file.file_path, file.content_hash)
+    directory = os.path.dirname(file_path)
+    filename = os.path.basename(file_path)
 
     return send_from_directory(directory, filename, as_attachment=True, download_name=file.original_filename)
 
@@ -284,24 +277,24 @@ def about():
 def delete_file(file_id):
     """Delete a file and its metadata."""
     try:
-        db = next(get_db())
+        db = get_db()
         file = db.query(File).filter(File.id == file_id).first()
 
         if file is None:
             flash('File not found', 'error')
             return redirect(url_for('main.file_list'))
 
-        # Delete the physical file
-        if os.path.exists(file.file_path):
-            os.remove(file.file_path)
-
-        # Store filename for flash message
+        # Store filename and path for after the record is gone
         filename = file.original_filename
+        file_path = file.file_path
 
         # Delete from database (cascade will delete metadata)
         db.delete(file)
         db.commit()
 
+        # Delete the physical file unless another record shares its contents
+        remove_unreferenced_file(db, file_path)
+
         flash(f'File "{filename}" deleted successfully', 'success')
     except Exception as e:
         logging.error(f"Error deleting file: {str(e)}")
@@ -0,0 +1,242 @@
+"""
+Batch metadata extraction.
+
+Saves many uploaded files (or the members of zip archives), fans them out
+across the extraction worker pool, and stores all File and Metadata rows in a
+single transaction once every extraction has finished.
+"""
+import os
+import zipfile
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from werkzeug.datastructures import FileStorage
+
+from app.config import app_config
+from app.models.metadata import File, Metadata
+from app.utils.database import SessionLocal
+from app.utils.file_utils import allowed_file, ingest_upload, release_claim
+from app.utils.dedup import remove_unreferenced_file
+from app.utils.extraction_pool import get_extraction_pool, timeout_metadata, ExtractionTimeout
+
+
+def is_zip_upload(filename):
+    """
+    Check whether an uploaded file should be unpacked as a zip archive.
+
+    Args:
+        filename (str): The uploaded filename
+
+    Returns:
+        bool: True for .zip files
+    """
+    return filename.lower().endswith('.zip')
+
+
+def _saved_entry(stored):
+    """Turn ingest_upload's result into a batch entry."""
+    return {
+        'filename': stored['original_filename'],
+        'safe_filename': stored['safe_filename'],
+        'file_path': stored['file_path'],
+        'file_size': stored['file_size'],
+        'mime_type': stored['mime_type'],
+        'file_extension': os.path.splitext(stored['original_filename'])[1].lower().lstrip('.'),
+        'content_hash': stored['content_hash'],
+        'hashes': stored['hashes'],
+        'claim': stored['claim']
+    }
+
+
+def save_batch_uploads(uploads):
+    """
+    Save uploaded files to disk, unpacking zip archives into their members.
+
+    Args:
+        uploads (list): Flask file objects
+
+    Returns:
+        tuple: (entries, rejected) where entries describe saved files and
+            rejected lists {'filename', 'error'} for files that were skipped
+
+    Raises:
+        ValueError: If the batch exceeds BATCH_MAX_FILES or the unpacked size limit
+    """
+    max_files = app_config.BATCH_MAX_FILES
+    max_unpacked = app_config.BATCH_MAX_UNCOMPRESSED_MB * 1024 * 1024
+    entries = []
+    rejected = []
+    unpacked_size = 0
+
+    def check_count():
+        if len(entries) >= max_files:
+            raise ValueError(f"Batch exceeds the limit of {max_files} files")
+
+    try:
+        for upload in uploads:
+            if not upload or upload.filename == '':
+                continue
+
+            if is_zip_upload(upload.filename):
+                try:
+                    archive = zipfile.ZipFile(upload.stream)
+                except zipfile.BadZipFile:
+                    rejected.append({'filename': upload.filename, 'error': 'Not a valid zip archive'})
+                    continue
+
+                with archive:
+                    for info in archive.infolist():
+                        member_name = os.path.basename(info.filename)
+                        if info.is_dir() or not member_name or info.filename.startswith('__MACOSX/'):
+                            continue
+                        if not allowed_file(member_name):
+                            rejected.append({'filename': info.filename, 'error': 'File type not allowed'})
+                            continue
+
+                        # Declared sizes are checked before anything is unpacked
+                        unpacked_size += info.file_size
+                        if unpacked_size > max_unpacked:
+                            raise ValueError(
+                                f"Zip contents exceed the limit of {app_config.BATCH_MAX_UNCOMPRESSED_MB} MB"
+                            )
+                        check_count()
+
+                        with archive.open(info) as member:
+                            member_file = FileStorage(stream=member, filename=member_name)
+                            entries.append(_saved_entry(ingest_upload(member_file)))
+
+            elif allowed_file(upload.filename):
+                check_count()
+                entries.append(_saved_entry(ingest_upload(upload)))
+            else:
+                rejected.append({'filename': upload.filename, 'error': 'File type not allowed'})
+
+    except Exception:
+        # Don't leave a partial batch behind
+        remove_batch_files(entries)
+        raise
+
+    return entries, rejected
+
+
+def release_batch_claims(entries):
+    """
+    Release the claims ingest took on a batch's saved files.
+
+    Args:
+        entries (list): Batch entries from save_batch_uploads
+    """
+    for entry in entries:
+        release_claim(entry)
+
+
+def remove_batch_files(entries):
+    """
+    Delete the saved files of a batch that no stored record refers to.
+
+    Args:
+        entries (list): Batch entries from save_batch_uploads
+    """
+    release_batch_claims(entries)
+    db = SessionLocal()
+    try:
+        for path in {entry['file_path'] for entry in entries}:
+            remove_unreferenced_file(db, path)
+    finally:
+        db.close()
+
+
+def extract_batch(entries, profile, indexes=None):
+    """
+    Extract metadata for a batch of saved files across the worker pool.
+
+    Args:
+        entries (list): Batch entries from save_batch_uploads
+        profile (str): Extraction profile
+        indexes (list, optional): Entries to extract; all of them if None
+
+    Yields:
+        tuple: (index, metadata_dict, error) in completion order; exactly one
+            of metadata_dict and error is None
+    """
+    pool = get_extraction_pool()
+
+    def run(entry):
+        try:
+            # Concurrency is bounded by this executor, so wait for pool slots
+            return pool.extract(entry['file_path'], profile, entry['mime_type'], block=True)
+        except ExtractionTimeout:
+            return timeout_metadata(entry['file_size'], entry['mime_type'], entry['file_extension'], pool.timeout)
+
+    with ThreadPoolExecutor(max_workers=app_config.EXTRACTION_WORKERS,
+                            thread_name_prefix='batch-extraction') as executor:
+        if indexes is None:
+            indexes = range(len(entries))
+        futures = {executor.submit(run, entries[index]): index for index in indexes}
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                yield index, future.result(), None
+            except Exception as e:
+                logging.error(f"Batch extraction failed for {entries[index]['filename']}: {str(e)}")
+                yield index, None, str(e)
+
+
+def store_batch(db, entries, results):
+    """
+    Insert File and Metadata rows for a batch in one transaction.
+
+    Args:
+        db (Session): Database session
+        entries (list): Batch entries from save_batch_uploads
+        results (dict): Entry index -> extracted metadata dictionary
+
+    Returns:
+        dict: Entry index -> stored file ID
+    """
+    indexes = sorted(results)
+    db_files = []
+    for index in indexes:
+        db_file = File(
+            filename=entries[index]['safe_filename'],
+            original_filename=entries[index]['filename'],
+            file_path=entries[index]['file_path'],
+            file_size=entries[index]['file_size'],
+            mime_type=entries[index]['mime_type'],
+            file_extension=entries[index]['file_extension']
+        )
+        db_file.apply_hashes(entries[index]['hashes'])
+        db_files.append(db_file)
+
+    try:
+        db.add_all(db_files)
+        db.flush()  # Assign file IDs in one batched insert
+
+        db_metadata = []
+        for index, db_file in zip(indexes, db_files):
+            metadata_dict = results[index]
+
+            extracted_text = metadata_dict.get('extracted_text', '')
+            if not extracted_text and 'text_preview' in metadata_dict:
+                extracted_text = metadata_dict.get('text_preview', '')
+
+            metadata_type = metadata_dict.get('extracted_by', '').replace('MetadataExtractor', '').lower()
+            if not metadata_type:
+                metadata_type = 'generic'
+
+            # Worker results are already plain JSON types
+            db_metadata.append(Metadata(
+                file_id=db_file.id,
+                metadata_type=metadata_type,
+                metadata_json=metadata_dict,
+                extraction_duration=metadata_dict.get('extraction_duration', metadata_dict.get('extraction_time_ms', 0)),
+                extracted_text=extracted_text
+            ))
+
+        db.add_all(db_metadata)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    return {index: db_file.id for index, db_file in zip(indexes, db_files)}
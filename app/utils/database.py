@@ -1,8 +1,9 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
 from dotenv import load_dotenv
+from flask import g
 
 # Load environment variables
 load_dotenv()
@@ -30,24 +31,98 @@ else:
 # Create engine with appropriate settings for environment
 is_production = os.getenv('FLASK_ENV') == 'production'
 
+# Connection pool bounds; requests wait up to DB_POOL_TIMEOUT seconds for a connection
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10 if is_production else 5))  # Larger pool for production
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 10))
+DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', 30))
+
+# SQL statement logging is opt-in; it is far too verbose to leave on by default
+DB_ECHO = os.getenv('DB_ECHO', 'false').lower() == 'true'
+
+# SQLite tuning applied to every new connection
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000))  # Wait for locks instead of failing
+SQLITE_CACHE_SIZE_KB = int(os.getenv('SQLITE_CACHE_SIZE_KB', 64 * 1024))  # Page cache per connection
+SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))  # Bytes of the file read via mmap
+
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
-    echo=not is_production,  # Only echo in non-production environments
+    echo=DB_ECHO,
     pool_pre_ping=True,  # Helps with connection issues after idle periods
     pool_recycle=600,  # Recycle connections after 10 minutes
-    pool_size=10 if is_production else 5  # Larger pool for production
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT
 )
 
+if DB_ENGINE == 'sqlite':
+    @event.listens_for(engine, 'connect')
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        """
+        Configure each SQLite connection for concurrent use.
+
+        WAL lets readers proceed while a writer commits, and synchronous=NORMAL
+        is durable in WAL mode apart from the last transactions before a power
+        loss. The busy timeout makes writers queue for the lock rather than
+        failing with 'database is locked'.
+        """
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 # Create base class for models
 Base = declarative_base()
 
-# Function to get database session
 def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
\ No newline at end of file
+    """
+    Get the database session for the current request, opening it on first use.
+
+    The session is closed by close_db when the application context is torn
+    down, so its connection always goes back to the pool.
+
+    Returns:
+        Session: Request-scoped database session
+    """
+    if 'db' not in g:
+        g.db = SessionLocal()
+    return g.db
+
+def close_db(exception=None):
+    """Close the request's database session, rolling back anything uncommitted."""
+    db = g.pop('db', None)
+    if db is not None:
+        db.close()
+
+def init_app(app):
+    """
+    Register request-scoped session cleanup with the application.
+
+    Args:
+        app (Flask): The application
+    """
+    app.teardown_appcontext(close_db)
+
+def get_pool_status():
+    """
+    Report connection pool usage.
+
+    Returns:
+        dict: Pool size, connections checked in and out, and overflow in use
+    """
+    pool = engine.pool
+    status = {
+        'pool_class': type(pool).__name__,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'timeout': DB_POOL_TIMEOUT
+    }
+    for metric in ('size', 'checkedin', 'checkedout', 'overflow'):
+        if hasattr(pool, metric):
+            status[metric] = getattr(pool, metric)()
+    return status
\ No newline at end of file
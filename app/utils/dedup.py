@@ -0,0 +1,126 @@
+"""
+Deduplication of uploads by content hash.
+
+Uploads are stored under their SHA-256 digest, so several File records can
+share one file on disk. These helpers find earlier extractions of the same
+content so they can be reused, and only remove a stored file once nothing
+references it any more.
+"""
+import os
+import logging
+
+from sqlalchemy.orm import Session
+
+from app.models.metadata import File, Metadata, ExtractionJob
+from app.utils.extractors import STANDARD_PROFILE
+from app.utils.file_utils import ensure_upload_dir, lock_unclaimed_file
+
+# Job statuses whose file is still needed (see app.utils.jobs)
+ACTIVE_JOB_STATUSES = ('queued', 'running')
+
+
+def _reusable(metadata_json, profile):
+    """Check whether stored metadata came from a complete extraction with the given profile."""
+    if not isinstance(metadata_json, dict):
+        return False
+    if metadata_json.get('extraction_status') in ('timeout', 'error'):
+        return False
+    return metadata_json.get('extraction_profile', STANDARD_PROFILE) == profile
+
+
+def find_duplicates(db, content_hashes, profile=STANDARD_PROFILE):
+    """
+    Find stored files whose contents and extraction profile match.
+
+    Args:
+        db (Session): Database session
+        content_hashes (iterable): SHA-256 digests to look up
+        profile (str, optional): Extraction profile the metadata must come from
+
+    Returns:
+        dict: content_hash -> (File, Metadata) for the most recent match
+    """
+    content_hashes = {h for h in content_hashes if h}
+    if not content_hashes:
+        return {}
+
+    rows = (db.query(File, Metadata)
+            .join(Metadata, Metadata.file_id == File.id)
+            .filter(File.content_hash.in_(content_hashes))
+            .order_by(Metadata.id.desc())
+            .all())
+
+    duplicates = {}
+    for file, metadata in rows:
+        if file.content_hash not in duplicates and _reusable(metadata.metadata_json, profile):
+            duplicates[file.content_hash] = (file, metadata)
+    return duplicates
+
+
+def find_duplicate(db, content_hash, profile=STANDARD_PROFILE):
+    """
+    Find a stored file with the same contents and a reusable extraction.
+
+    Args:
+        db (Session): Database session
+        content_hash (str): SHA-256 digest of the contents
+        profile (str, optional): Extraction profile the metadata must come from
+
+    Returns:
+        tuple: (File, Metadata), or None if there is no match
+    """
+    return find_duplicates(db, [content_hash], profile).get(content_hash)
+
+
+def remove_unreferenced_file(db, file_path):
+    """
+    Delete a stored file unless something still refers to it.
+
+    A file is kept while a File record or an unfinished extraction job
+    points at it, or while an ingest that stored or reused it has not yet
+    released its claim (see app.utils.file_utils.StoredFileClaim). The
+    references are checked in a fresh transaction after the file is locked,
+    so records committed by ingests that have just released their claim are
+    seen.
+
+    Shard directories left empty by the removal are deleted as well, up to
+    but not including the upload folder.
+
+    Args:
+        db (Session): Database session; its engine is used for the check
+        file_path (str): Path of the stored file
+
+    Returns:
+        bool: True if the file was removed
+    """
+    lock = lock_unclaimed_file(file_path)
+    if lock is None:
+        return False
+    try:
+        with Session(bind=db.get_bind()) as check:
+            if check.query(File.id).filter(File.file_path == file_path).first() is not None:
+                return False
+            if check.query(ExtractionJob.id).filter(ExtractionJob.file_path == file_path,
+                                                    ExtractionJob.status.in_(ACTIVE_JOB_STATUSES)).first() is not None:
+                return False
+        os.remove(file_path)
+        _prune_empty_dirs(os.path.dirname(file_path))
+        return True
+    except OSError as e:
+        logging.error(f"Error removing stored file {file_path}: {str(e)}")
+        return False
+    finally:
+        lock.release()
+
+
+def _prune_empty_dirs(directory):
+    """Remove empty directories from directory upwards, stopping at the upload folder."""
+    upload_dir = os.path.realpath(ensure_upload_dir())
+    directory = os.path.realpath(directory)
+    while directory != upload_dir and directory.startswith(upload_dir + os.sep):
+        try:
+            os.rmdir(directory)
+        except OSError:
+            # Not empty, or another upload just created a file in it
+            break
+        directory = os.path.dirname(directory)
@@ -0,0 +1,221 @@
+"""
+Process pool for metadata extraction with hard timeouts.
+
+Extraction runs in long-lived worker processes so it never competes with
+request threads for the GIL. A worker that exceeds the timeout is killed and
+replaced, and each worker runs under an address-space limit. The number of
+extractions running or waiting is bounded; once it is reached, new requests
+are refused so callers can push back on clients instead of piling up work.
+"""
+import atexit
+import logging
+import multiprocessing
+import os
+import queue
+import subprocess
+import sys
+import threading
+
+from app.config import app_config
+from app.utils.extractors import STANDARD_PROFILE
+
+
+class ExtractionPoolError(Exception):
+    """Base class for extraction pool failures."""
+
+
+class ExtractionPoolBusy(ExtractionPoolError):
+    """Raised when the pool's queue is full."""
+
+
+class ExtractionTimeout(ExtractionPoolError):
+    """Raised when an extraction exceeds its timeout; the worker is replaced."""
+
+
+class ExtractionFailed(ExtractionPoolError):
+    """Raised when extraction fails inside the worker or the worker dies."""
+
+
+# Directory containing the app package, so workers can import it from any cwd
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class _Worker:
+    """A worker process and the parent's end of its pipe."""
+
+    def __init__(self, memory_limit_mb):
+        self.conn, child_conn = multiprocessing.Pipe()
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.pathsep.join(filter(None, [_PROJECT_ROOT, env.get('PYTHONPATH')]))
+        try:
+            # A fresh interpreter running only the worker module, so neither
+            # create_app() nor the parent's __main__ runs in the worker
+            self.process = subprocess.Popen(
+                [sys.executable, '-m', 'app.utils.extraction_worker',
+                 str(child_conn.fileno()), str(memory_limit_mb)],
+                pass_fds=(child_conn.fileno(),),
+                stdin=subprocess.DEVNULL,
+                env=env
+            )
+        except Exception:
+            self.conn.close()
+            raise
+        finally:
+            child_conn.close()
+
+    def kill(self):
+        """Terminate the worker immediately."""
+        self.process.kill()
+        self.process.wait()
+        self.conn.close()
+
+    def stop(self, timeout=1.0):
+        """Ask the worker to exit, killing it if it does not."""
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        try:
+            self.process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        self.conn.close()
+
+
+class ExtractionPool:
+    """
+    Fixed-size pool of extraction worker processes.
+
+    Args:
+        workers (int): Number of worker processes
+        timeout (float): Seconds an extraction may run before its worker is killed
+        queue_depth (int): Extractions allowed to wait for a free worker
+        memory_limit_mb (int): Address-space limit per worker in MB, 0 for none
+    """
+
+    def __init__(self, workers=2, timeout=30, queue_depth=8, memory_limit_mb=0):
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+        self._slots = threading.BoundedSemaphore(workers + queue_depth)
+        self._idle = queue.Queue()
+        self._closed = False
+
+        for _ in range(workers):
+            self._idle.put(self._spawn())
+
+    def _spawn(self):
+        return _Worker(self.memory_limit_mb)
+
+    def extract(self, file_path, profile=STANDARD_PROFILE, mime_type=None, timeout=None, block=False):
+        """
+        Extract metadata from a file in a worker process.
+
+        Args:
+            file_path (str): Path to the file
+            profile (str, optional): Extraction profile. Defaults to 'standard'.
+            mime_type (str, optional): MIME type already detected for the file
+            timeout (float, optional): Override for the pool's timeout
+            block (bool, optional): Wait for a free slot instead of raising
+                ExtractionPoolBusy. For callers that already bound their own work.
+
+        Returns:
+            dict: JSON-safe metadata dictionary
+
+        Raises:
+            ExtractionPoolBusy: If too many extractions are already running or queued
+            ExtractionTimeout: If the extraction did not finish in time
+            ExtractionFailed: If the extraction raised or the worker died
+        """
+        if self._closed:
+            raise ExtractionPoolError("Extraction pool has been shut down")
+        if not self._slots.acquire(blocking=block):
+            raise ExtractionPoolBusy("Too many extractions in progress, try again later")
+
+        try:
+            worker = self._idle.get()
+            timeout = self.timeout if timeout is None else timeout
+
+            try:
+                worker.conn.send((file_path, profile, mime_type))
+                if not worker.conn.poll(timeout):
+                    # The only way to stop a runaway extraction is to kill its process
+                    logging.warning(f"Metadata extraction timed out after {timeout}s, restarting worker: {file_path}")
+                    worker.kill()
+                    worker = self._spawn()
+                    raise ExtractionTimeout(f"Metadata extraction timed out after {timeout} seconds")
+
+                status, result = worker.conn.recv()
+            except (EOFError, OSError) as e:
+                logging.error(f"Extraction worker exited unexpectedly: {str(e)}")
+                worker.kill()
+                worker = self._spawn()
+                raise ExtractionFailed("Extraction worker exited unexpectedly")
+            finally:
+                self._idle.put(worker)
+
+            if status != 'success':
+                raise ExtractionFailed(result)
+            return result
+        finally:
+            self._slots.release()
+
+    def shutdown(self):
+        """Stop all idle workers."""
+        self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            worker.stop()
+
+
+def timeout_metadata(file_size, mime_type, file_extension, timeout):
+    """
+    Build the basic metadata stored for a file whose extraction timed out.
+
+    Args:
+        file_size (int): File size in bytes
+        mime_type (str): Detected MIME type
+        file_extension (str): File extension without the dot
+        timeout (float): Seconds the extraction was allowed
+
+    Returns:
+        dict: Minimal metadata flagged with extraction_status 'timeout'
+    """
+    return {
+        "extracted_by": "BasicFileInfo",
+        "file_info": {
+            "file_size": file_size,
+            "mime_type": mime_type,
+            "extension": file_extension
+        },
+        "extraction_duration": int(timeout * 1000),
+        "extraction_status": "timeout",
+        "warning": "Metadata extraction timed out, only basic information is available"
+    }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_extraction_pool():
+    """
+    Get the shared extraction pool, starting it on first use.
+
+    Returns:
+        ExtractionPool: Pool configured from the application config
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ExtractionPool(
+                workers=app_config.EXTRACTION_WORKERS,
+                timeout=app_config.EXTRACTION_TIMEOUT,
+                queue_depth=app_config.EXTRACTION_QUEUE_DEPTH,
+                memory_limit_mb=app_config.EXTRACTION_MEMORY_LIMIT_MB
+            )
+            atexit.register(_pool.shutdown)
+        return _pool
@@ -0,0 +1,70 @@
+"""
+Entry point for extraction worker processes.
+
+Workers are started as ``python -m app.utils.extraction_worker`` rather than
+through multiprocessing, whose spawn and forkserver start methods both replay
+the parent's ``__main__`` in every child. Starting from this module means a
+worker only imports the extractors: it never runs ``create_app()`` and never
+re-executes the script that started the pool.
+"""
+import json
+import logging
+import sys
+from multiprocessing.connection import Connection
+
+
+def worker_main(conn, memory_limit_mb):
+    """
+    Worker process loop: receive extraction tasks and send back results.
+
+    Args:
+        conn: Connection for receiving tasks and sending results
+        memory_limit_mb (int): Address-space limit in MB, 0 for none
+    """
+    if memory_limit_mb:
+        try:
+            import resource
+            limit = memory_limit_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except (ImportError, ValueError, OSError) as e:
+            logging.warning(f"Could not apply extraction worker memory limit: {str(e)}")
+
+    from app.utils.extractors import extract_metadata
+    from app.utils.file_utils import CustomJSONEncoder
+
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+
+        file_path, profile, mime_type = task
+        try:
+            metadata = extract_metadata(file_path, profile, mime_type)
+            # Send plain JSON types so results pickle cleanly and are ready to store
+            conn.send(('success', json.loads(json.dumps(metadata, cls=CustomJSONEncoder))))
+        except MemoryError:
+            conn.send(('error', f"Metadata extraction exceeded the {memory_limit_mb} MB worker memory limit"))
+        except Exception as e:
+            conn.send(('error', str(e)))
+
+
+def main(argv=None):
+    """
+    Run a worker on the connection file descriptor passed by the pool.
+
+    Args:
+        argv (list, optional): ``[fd, memory_limit_mb]``. Defaults to sys.argv[1:].
+    """
+    fd, memory_limit_mb = (argv if argv is not None else sys.argv[1:])[:2]
+    conn = Connection(int(fd))
+    try:
+        worker_main(conn, int(memory_limit_mb))
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
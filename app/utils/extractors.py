@@ -1,14 +1,19 @@
+import io
 import os
 import time
 import mimetypes
+import zipfile
 from PIL import Image, UnidentifiedImageError
-from PIL.ExifTags import TAGS
 import exifread
 import PyPDF2
 import docx
+from docx.opc.constants import CONTENT_TYPE as CT
+from docx.opc.packuri import PackURI
+from docx.opc.parts.coreprops import CorePropertiesPart
 import openpyxl
-import magic
 import re
+from app.utils.steganalysis import STEGANALYSIS_AVAILABLE, DecodedImage, run_analyzers, summarize_analyses
+from app.utils.file_utils import sniff_mime_type
 
 # Import new libraries for audio and video metadata extraction
 try:
@@ -36,9 +41,26 @@ try:
 except ImportError:
     MEDIAINFO_AVAILABLE = False
 
+# Extraction profiles, from cheapest to most thorough:
+#   fast     - container headers and metadata segments only, no pixel or page decoding
+#   standard - adds text extraction and the steganography analyses
+#   forensic - additionally parses vendor MakerNote data in EXIF
+FAST_PROFILE = 'fast'
+STANDARD_PROFILE = 'standard'
+FORENSIC_PROFILE = 'forensic'
+EXTRACTION_PROFILES = (FAST_PROFILE, STANDARD_PROFILE, FORENSIC_PROFILE)
+
+
 class MetadataExtractor:
     """Base class for metadata extraction."""
 
+    def __init__(self, profile=STANDARD_PROFILE):
+        """
+        Args:
+            profile (str, optional): Extraction profile. Defaults to 'standard'.
+        """
+        self.profile = profile
+
     def extract(self, file_path):
         """
         Extract metadata from a file.
@@ -64,9 +86,15 @@ class ImageMetadataExtractor(MetadataExtractor):
             "image_info": {}
         }
 
+        quantization = None
+
         try:
             # Method 1: Extract metadata using Pillow
             with Image.open(file_path) as img:
+                # Keep the luminance table for coefficient-domain analysis
+                if img.format == "JPEG" and getattr(img, "quantization", None):
+                    quantization = img.quantization.get(0)
+
                 # Basic image info
                 metadata["image_info"] = {
                     "format": img.format,
@@ -76,127 +104,109 @@ class ImageMetadataExtractor(MetadataExtractor):
                     "aspect_ratio": round(img.width / img.height, 2) if img.height != 0 else None,
                 }
 
-                # EXIF data if available
-                if hasattr(img, '_getexif') and img._getexif():
-                    exif_data = img._getexif()
-                    if exif_data:
-                        for tag_id, value in exif_data.items():
-                            tag = TAGS.get(tag_id, tag_id)
+                # Raw EXIF payload Pillow already read from the header segments
+                exif_payload = img.info.get("exif")
 
-                            # Convert bytes to string or ignore if not convertible
-                            if isinstance(value, bytes):
-                                try:
-                                    value = value.decode('utf-8')
-                                except UnicodeDecodeError:
-                                    value = str(value)
+            # Method 2: Parse EXIF once with exifread and derive every view from it
+            exif_tags = self._read_exif_tags(file_path, exif_payload, metadata["image_info"]["format"])
 
-                            metadata["exif"][tag] = value
+            # Organize EXIF data by category
+            exif_by_category = {}
+            gps_data = {}
 
-            # Method 2: More detailed EXIF using exifread
-            with open(file_path, 'rb') as f:
-                exif_tags = exifread.process_file(f)
+            for tag, value in exif_tags.items():
+                # Skip the embedded thumbnail, which exifread returns as raw bytes
+                if not hasattr(value, 'values'):
+                    continue
 
-                # Organize EXIF data by category
-                exif_by_category = {}
-                gps_data = {}
+                # Extract category from tag name
+                if "GPS" in tag:
+                    # Store GPS tags separately, keeping their rational values
+                    gps_data[tag] = value
+                else:
+                    # Get the category from the tag name
+                    parts = tag.split()
+                    category = parts[0] if len(parts) > 0 else "Other"
 
-                for tag, value in exif_tags.items():
-                    # Extract category from tag name
-                    if "GPS" in tag:
-                        # Store GPS data separately
-                        gps_data[tag] = str(value)
-                    else:
-                        # Get the category from the tag name
-                        parts = tag.split()
-                        category = parts[0] if len(parts) > 0 else "Other"
+                    # Clean up category name
+                    category = re.sub(r'[^\w\s]', '', category)
 
-                        # Clean up category name
-                        category = re.sub(r'[^\w\s]', '', category)
+                    if category not in exif_by_category:
+                        exif_by_category[category] = {}
 
-                        if category not in exif_by_category:
-                            exif_by_category[category] = {}
+                    # Store the tag value
+                    tag_name = " ".join(parts[1:]) if len(parts) > 1 else tag
+                    exif_by_category[category][tag_name] = str(value)
 
-                        # Store the tag value
-                        tag_name = " ".join(parts[1:]) if len(parts) > 1 else tag
-                        exif_by_category[category][tag_name] = str(value)
+                    # Flat view keyed by bare tag name, for the main and EXIF IFDs
+                    if category in ("Image", "EXIF"):
+                        metadata["exif"][tag_name] = self._exif_flat_value(value)
 
-                # Add GPS coordinates if available
-                if gps_data:
-                    # Try to extract latitude and longitude
-                    try:
-                        lat_ref = gps_data.get("GPS GPSLatitudeRef", "N")
-                        lat = self._convert_to_degrees(gps_data.get("GPS GPSLatitude", "0, 0, 0"))
-                        if lat_ref == "S":
-                            lat = -lat
-
-                        lon_ref = gps_data.get("GPS GPSLongitudeRef", "E")
-                        lon = self._convert_to_degrees(gps_data.get("GPS GPSLongitude", "0, 0, 0"))
-                        if lon_ref == "W":
-                            lon = -lon
-
-                        metadata["gps_coordinates"] = {
-                            "latitude": lat,
-                            "longitude": lon,
-                            "google_maps_url": f"https://www.google.com/maps/search/?api=1&query={lat},{lon}"
-                        }
-                    except Exception as e:
-                        # GPS conversion failed
-                        pass
+            # Add GPS coordinates if available
+            if gps_data:
+                # Try to extract latitude and longitude
+                try:
+                    lat_ref = str(gps_data.get("GPS GPSLatitudeRef", "N"))
+                    lat = self._convert_to_degrees(gps_data.get("GPS GPSLatitude", "0, 0, 0"))
+                    if lat_ref == "S":
+                        lat = -lat
+
+                    lon_ref = str(gps_data.get("GPS GPSLongitudeRef", "E"))
+                    lon = self._convert_to_degrees(gps_data.get("GPS GPSLongitude", "0, 0, 0"))
+                    if lon_ref == "W":
+                        lon = -lon
+
+                    metadata["gps_coordinates"] = {
+                        "latitude": lat,
+                        "longitude": lon,
+                        "google_maps_url": f"https://www.google.com/maps/search/?api=1&query={lat},{lon}"
+                    }
+                except Exception as e:
+                    # GPS conversion failed
+                    pass
 
-                metadata["exif_detailed"] = exif_by_category
+            metadata["exif_detailed"] = exif_by_category
 
-                # Extract any text found in the EXIF data
-                text_content = []
-                for category, tags in exif_by_category.items():
-                    for tag, value in tags.items():
-                        if isinstance(value, str) and len(value) > 10 and not value.startswith("["):
-                            text_content.append(f"{tag}: {value}")
+            # Extract any text found in the EXIF data
+            text_content = []
+            for category, tags in exif_by_category.items():
+                for tag, value in tags.items():
+                    if isinstance(value, str) and len(value) > 10 and not value.startswith("["):
+                        text_content.append(f"{tag}: {value}")
 
-                if "ImageDescription" in metadata["exif"]:
-                    text_content.append(f"Image Description: {metadata['exif']['ImageDescription']}")
+            if "ImageDescription" in metadata["exif"]:
+                text_content.append(f"Image Description: {metadata['exif']['ImageDescription']}")
 
-                if "UserComment" in metadata["exif"]:
-                    text_content.append(f"User Comment: {metadata['exif']['UserComment']}")
+            if "UserComment" in metadata["exif"]:
+                text_content.append(f"User Comment: {metadata['exif']['UserComment']}")
 
-                if "Artist" in metadata["exif"]:
-                    text_content.append(f"Artist: {metadata['exif']['Artist']}")
+            if "Artist" in metadata["exif"]:
+                text_content.append(f"Artist: {metadata['exif']['Artist']}")
 
-                if "Copyright" in metadata["exif"]:
-                    text_content.append(f"Copyright: {metadata['exif']['Copyright']}")
+            if "Copyright" in metadata["exif"]:
+                text_content.append(f"Copyright: {metadata['exif']['Copyright']}")
 
-                if text_content:
-                    metadata["extracted_text"] = "\n".join(text_content)
+            if text_content:
+                metadata["extracted_text"] = "\n".join(text_content)
 
-            # Add steganography analysis if the image is a JPEG or PNG
-            if metadata["image_info"]["format"] in ["JPEG", "PNG"]:
-                try:
-                    import cv2
-                    import numpy as np
-                    from scipy.fftpack import dct
-
-                    # Check image size to avoid processing large images
-                    img_size = metadata["image_info"]["width"] * metadata["image_info"]["height"]
-
-                    # Always run the faster analysis methods
-                    metadata["LSB_Analysis"] = self._lsb_analysis(file_path)
-                    metadata["Chi_Square_Analysis"] = self._chi_square_analysis(file_path)
-
-                    # Only run more intensive analysis for smaller images (under 1 million pixels)
-                    if img_size < 1000000:  # 1000x1000 or equivalent
-                        metadata["DCT_Analysis"] = self._dct_analysis(file_path)
-                        metadata["Sample_Pair_Analysis"] = self._sample_pair_analysis(file_path)
-                        metadata["RS_Analysis"] = self._rs_analysis(file_path)
-                        metadata["PVD_Analysis"] = self._pvd_analysis(file_path)
-                    else:
-                        metadata["DCT_Analysis"] = "Skipped for large image"
-                        metadata["Sample_Pair_Analysis"] = "Skipped for large image"
-                        metadata["RS_Analysis"] = "Skipped for large image"
-                        metadata["PVD_Analysis"] = "Skipped for large image"
-                        metadata["Analysis_Note"] = "Some analyses were skipped due to large image size"
-                except ImportError:
-                    metadata["steganography_analysis"] = "Steganography analysis requires OpenCV and SciPy libraries"
-                except Exception as e:
-                    metadata["steganography_analysis_error"] = str(e)
+            # Add steganography analysis if the image is a JPEG or PNG. The fast
+            # profile never decodes pixels.
+            if self.profile != FAST_PROFILE and metadata["image_info"]["format"] in ["JPEG", "PNG"]:
+                if not STEGANALYSIS_AVAILABLE:
+                    metadata["steganography_analysis_error"] = "Steganography analysis requires OpenCV, NumPy and SciPy libraries"
+                else:
+                    try:
+                        # Decode the pixels once and share them across all analyzers
+                        size = (metadata["image_info"]["width"], metadata["image_info"]["height"])
+                        image = DecodedImage.from_file(file_path, quantization, size=size)
+                        if image is None:
+                            raise ValueError("Unable to read image file")
+
+                        results = run_analyzers(image)
+                        metadata["steganography_analysis"] = results
+                        metadata["steganography_summary"] = summarize_analyses(results)
+                    except Exception as e:
+                        metadata["steganography_analysis_error"] = str(e)
 
         except UnidentifiedImageError:
             metadata["error"] = "Could not identify image file"
@@ -206,6 +216,57 @@ class ImageMetadataExtractor(MetadataExtractor):
         metadata["extraction_duration"] = int((time.time() - start_time) * 1000)
         return metadata
 
+    def _read_exif_tags(self, file_path, exif_payload=None, image_format=None):
+        """
+        Parse EXIF tags in a single pass.
+
+        JPEG, PNG and WebP expose their APP1/eXIf payload through Pillow, which
+        has already read it with the image header, so exifread parses it from
+        memory. TIFF stores EXIF in the container itself and is read from disk.
+
+        Args:
+            file_path (str): Path to the image file
+            exif_payload (bytes, optional): Raw EXIF payload from Pillow
+            image_format (str, optional): Pillow format name
+
+        Returns:
+            dict: exifread tags keyed by "<IFD> <TagName>"
+        """
+        # MakerNote decoding is only worth its cost for forensic extraction
+        details = self.profile == FORENSIC_PROFILE
+
+        if exif_payload:
+            # Strip the APP1 identifier to leave a bare TIFF structure
+            if exif_payload.startswith(b"Exif\x00\x00"):
+                exif_payload = exif_payload[6:]
+            return exifread.process_file(io.BytesIO(exif_payload), details=details)
+
+        if image_format == "TIFF":
+            with open(file_path, 'rb') as f:
+                return exifread.process_file(f, details=details)
+
+        return {}
+
+    def _exif_flat_value(self, tag):
+        """
+        Return a native value for single-valued numeric tags, otherwise the printable form.
+
+        Values are plain int, float or str so the metadata can be stored as JSON
+        as is, without exifread's Ratio objects.
+        """
+        values = tag.values
+        # Field type 7 is UNDEFINED (e.g. UserComment), which exifread decodes in printable
+        if isinstance(values, list) and len(values) == 1 and tag.field_type != 7:
+            value = values[0]
+            if isinstance(value, int):
+                return int(value)
+            # Rationals, matching how CustomJSONEncoder serializes them
+            if hasattr(value, 'numerator') and hasattr(value, 'denominator'):
+                return float(value.numerator) / float(value.denominator) if value.denominator else 0
+            if isinstance(value, float):
+                return value
+        return str(tag.printable)
+
     def _convert_to_degrees(self, value):
         """Helper method to convert GPS coordinates from DMS format to decimal degrees."""
         if not value:
@@ -225,204 +286,6 @@ class ImageMetadataExtractor(MetadataExtractor):
 
         return degrees + minutes + seconds
 
-    def _lsb_analysis(self, file_path):
-        """Analyze image for LSB steganography."""
-        try:
-            import cv2
-            import numpy as np
-
-            img = cv2.imread(file_path)
-            if img is None:
-                return "Unable to read image file"
-
-            lsb = img[:,:,0] % 2
-            unusual_patterns = np.sum(lsb) / (img.shape[0] * img.shape[1])
-
-            if unusual_patterns > 0.45 and unusual_patterns < 0.55:
-                return "Suspicious: Possible LSB steganography detected"
-            else:
-                return "No obvious LSB steganography detected"
-        except Exception as e:
-            return f"Error in LSB analysis: {str(e)}"
-
-    def _chi_square_analysis(self, file_path):
-        """Analyze image using Chi-Square statistical test."""
-        try:
-            import cv2
-            import numpy as np
-
-            img = cv2.imread(file_path, 0)  # Read as grayscale
-            if img is None:
-                return "Unable to read image file"
-
-            hist = cv2.calcHist([img], [0], None, [256], [0, 256])
-            even_hist = hist[::2]
-            odd_hist = hist[1::2]
-
-            chi_square = np.sum((even_hist - odd_hist)**2 / (even_hist + odd_hist + 1e-6))
-
-            if chi_square < 0.1:
-                return "Suspicious: Possible steganography detected by Chi-Square analysis"
-            else:
-                return "No steganography detected by Chi-Square analysis"
-        except Exception as e:
-            return f"Error in Chi-Square analysis: {str(e)}"
-
-    def _dct_analysis(self, file_path):
-        """Analyze image using Discrete Cosine Transform."""
-        try:
-            import cv2
-            import numpy as np
-            from scipy.fftpack import dct
-
-            img = cv2.imread(file_path, 0)  # Read as grayscale
-            if img is None:
-                return "Unable to read image file"
-
-            img_dct = dct(dct(img.T, norm='ortho').T, norm='ortho')
-            dct_values = np.abs(img_dct.flatten())
-
-            threshold = np.percentile(dct_values, 99.95)
-            suspicious_coeffs = np.sum(dct_values > threshold)
-
-            if suspicious_coeffs > 100:
-                return "Suspicious: Possible steganography detected by DCT analysis"
-            else:
-                return "No obvious steganography detected by DCT analysis"
-        except Exception as e:
-            return f"Error in DCT analysis: {str(e)}"
-
-    def _sample_pair_analysis(self, file_path):
-        """Analyze image using Sample Pair Analysis."""
-        try:
-            import cv2
-            import numpy as np
-
-            img = cv2.imread(file_path, 0)  # Read as grayscale
-            if img is None:
-                return "Unable to read image file"
-
-            rows, cols = img.shape
-            pairs = np.column_stack((img[:-1, :].flatten(), img[1:, :].flatten()))
-
-            even_pairs = pairs[np.sum(pairs % 2, axis=1) == 0]
-            odd_pairs = pairs[np.sum(pairs % 2, axis=1) == 1]
-
-            beta = len(even_pairs) / (len(even_pairs) + len(odd_pairs))
-
-            if 0.45 < beta < 0.55:
-                return "Suspicious: Possible steganography detected by Sample Pair Analysis"
-            else:
-                return "No steganography detected by Sample Pair Analysis"
-        except Exception as e:
-            return f"Error in Sample Pair Analysis: {str(e)}"
-
-    def _rs_analysis(self, file_path):
-        """Analyze image using RS (Regular-Singular) Analysis with sampling for performance."""
-        try:
-            import cv2
-            import numpy as np
-
-            img = cv2.imread(file_path, 0)  # Read as grayscale
-            if img is None:
-                return "Unable to read image file"
-
-            def flip_lsb(x):
-                return x ^ 1
-
-            rows, cols = img.shape
-
-            # Use sampling for large images
-            # Sample at most 2500 blocks (50x50 grid of 2x2 blocks)
-            step_row = max(2, rows // 50)
-            step_col = max(2, cols // 50)
-
-            r_m, s_m, r_m_inv, s_m_inv = 0, 0, 0, 0
-
-            for i in range(0, rows-1, step_row):
-                if i + 2 > rows:
-                    continue
-                for j in range(0, cols-1, step_col):
-                    if j + 2 > cols:
-                        continue
-
-                    block = img[i:i+2, j:j+2].astype(int)
-                    flipped_block = np.vectorize(flip_lsb)(block)
-
-                    diff = np.sum(np.abs(block - np.roll(block, 1, axis=1)))
-                    diff_flipped = np.sum(np.abs(flipped_block - np.roll(flipped_block, 1, axis=1)))
-
-                    if diff < diff_flipped:
-                        r_m += 1
-                    elif diff > diff_flipped:
-                        s_m += 1
-
-                    diff_inv = np.sum(np.abs(block - np.roll(block, -1, axis=1)))
-                    diff_flipped_inv = np.sum(np.abs(flipped_block - np.roll(flipped_block, -1, axis=1)))
-
-                    if diff_inv < diff_flipped_inv:
-                        r_m_inv += 1
-                    elif diff_inv > diff_flipped_inv:
-                        s_m_inv += 1
-
-            total = r_m + s_m
-            total_inv = r_m_inv + s_m_inv
-
-            if total == 0 or total_inv == 0:
-                return "Unable to perform RS Analysis: insufficient data"
-
-            d = abs((r_m - s_m) / total) - abs((r_m_inv - s_m_inv) / total_inv)
-
-            if abs(d) < 0.05:
-                return "Suspicious: Possible steganography detected by RS Analysis"
-            else:
-                return "No steganography detected by RS Analysis"
-        except Exception as e:
-            return f"Error in RS Analysis: {str(e)}"
-
-    def _pvd_analysis(self, file_path):
-        """Analyze image using Pixel Value Differencing with improved performance."""
-        try:
-            import cv2
-            import numpy as np
-
-            img = cv2.imread(file_path, 0)  # Read as grayscale
-            if img is None:
-                return "Unable to read image file"
-
-            rows, cols = img.shape
-
-            # For large images, sample only a portion
-            if rows * cols > 1000000:  # For images larger than 1MP
-                # Take a sample from the center of the image
-                sample_size = 1000  # 1000x1000 sample
-                start_row = max(0, (rows - sample_size) // 2)
-                start_col = max(0, (cols - sample_size) // 2)
-                end_row = min(rows, start_row + sample_size)
-                end_col = min(cols, start_col + sample_size)
-                img = img[start_row:end_row, start_col:end_col]
-                rows, cols = img.shape
-
-            # Vectorized implementation for horizontal differences
-            horizontal_diffs = np.abs(img[:, 1:] - img[:, :-1])
-
-            # Create and normalize histogram
-            diff_hist = np.bincount(horizontal_diffs.flatten(), minlength=256)
-            diff_hist = diff_hist / np.sum(diff_hist)
-
-            # Check for unusual peaks in the histogram
-            mean_val = np.mean(diff_hist)
-            std_val = np.std(diff_hist)
-            peaks = np.where(diff_hist > mean_val + 2 * std_val)[0]
-
-            if len(peaks) > 5:  # Threshold can be adjusted
-                return "Suspicious: Possible steganography detected by PVD Analysis"
-            else:
-                return "No obvious steganography detected by PVD Analysis"
-        except Exception as e:
-            return f"Error in PVD Analysis: {str(e)}"
-
-
 class PDFMetadataExtractor(MetadataExtractor):
     """Extract metadata from PDF files."""
 
@@ -451,6 +314,11 @@ class PDFMetadataExtractor(MetadataExtractor):
                             key = key[1:]  # Remove leading slash
                         metadata["pdf_info"][key] = value
 
+                # The fast profile stops at the document info dictionary
+                if self.profile == FAST_PROFILE:
+                    metadata["extraction_time_ms"] = int((time.time() - start_time) * 1000)
+                    return metadata
+
                 # Extract full text content from all pages (up to a reasonable limit)
                 full_text = []
                 page_limit = min(10, len(pdf_reader.pages))  # Process up to 10 pages
@@ -488,25 +356,21 @@ class DocxMetadataExtractor(MetadataExtractor):
         }
 
         try:
+            if self.profile == FAST_PROFILE:
+                # Read only the core properties part, not the document body
+                core_properties = self._read_core_properties(file_path)
+                metadata["document_info"] = self._document_info(core_properties)
+                metadata["extraction_time_ms"] = int((time.time() - start_time) * 1000)
+                return metadata
+
             doc = docx.Document(file_path)
 
             # Document properties
-            core_properties = doc.core_properties
-            metadata["document_info"] = {
-                "author": core_properties.author,
-                "created": str(core_properties.created) if core_properties.created else None,
-                "last_modified_by": core_properties.last_modified_by,
-                "modified": str(core_properties.modified) if core_properties.modified else None,
-                "title": core_properties.title,
-                "subject": core_properties.subject,
-                "keywords": core_properties.keywords,
-                "language": core_properties.language,
-                "category": core_properties.category,
-                "comments": core_properties.comments,
-                "content_status": core_properties.content_status,
+            metadata["document_info"] = self._document_info(doc.core_properties)
+            metadata["document_info"].update({
                 "paragraphs": len(doc.paragraphs),
                 "sections": len(doc.sections),
-            }
+            })
 
             # Extract all text from the document
             full_text = []
@@ -527,6 +391,41 @@ class DocxMetadataExtractor(MetadataExtractor):
         metadata["extraction_time_ms"] = int((time.time() - start_time) * 1000)
         return metadata
 
+    def _read_core_properties(self, file_path):
+        """
+        Parse the core properties part of a DOCX without loading the rest of the package.
+
+        Args:
+            file_path (str): Path to the DOCX file
+
+        Returns:
+            CoreProperties: python-docx core properties
+        """
+        try:
+            with zipfile.ZipFile(file_path) as archive:
+                blob = archive.read('docProps/core.xml')
+        except KeyError:
+            # Core properties stored under a non-standard name
+            return docx.Document(file_path).core_properties
+        part = CorePropertiesPart.load(PackURI('/docProps/core.xml'), CT.OPC_CORE_PROPERTIES, blob, None)
+        return part.core_properties
+
+    def _document_info(self, core_properties):
+        """Build the document_info dict from python-docx core properties."""
+        return {
+            "author": core_properties.author,
+            "created": str(core_properties.created) if core_properties.created else None,
+            "last_modified_by": core_properties.last_modified_by,
+            "modified": str(core_properties.modified) if core_properties.modified else None,
+            "title": core_properties.title,
+            "subject": core_properties.subject,
+            "keywords": core_properties.keywords,
+            "language": core_properties.language,
+            "category": core_properties.category,
+            "comments": core_properties.comments,
+            "content_status": core_properties.content_status,
+        }
+
 
 class ExcelMetadataExtractor(MetadataExtractor):
     """Extract metadata from Excel files."""
@@ -572,6 +471,10 @@ class ExcelMetadataExtractor(MetadataExtractor):
                 }
                 metadata["sheets"].append(sheet_info)
 
+                # The fast profile stops at the sheet dimensions
+                if self.profile == FAST_PROFILE:
+                    continue
+
                 # Extract a sample of data from each sheet (first 50 rows, first 10 columns)
                 sheet_content = []
                 sheet_content.append(f"[Sheet: {sheet_name}]")
@@ -603,6 +506,10 @@ class ExcelMetadataExtractor(MetadataExtractor):
 
                 full_text.extend(sheet_content)
 
+            if self.profile == FAST_PROFILE:
+                metadata["extraction_time_ms"] = int((time.time() - start_time) * 1000)
+                return metadata
+
             # Join all sheet content with proper spacing
             all_text = "\n".join(full_text)
 
@@ -629,6 +536,12 @@ class TextMetadataExtractor(MetadataExtractor):
         }
 
         try:
+            # The fast profile records the size without reading the text
+            if self.profile == FAST_PROFILE:
+                metadata["text_info"] = {"file_size_bytes": os.path.getsize(file_path)}
+                metadata["extraction_time_ms"] = int((time.time() - start_time) * 1000)
+                return metadata
+
             with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
                 content = f.read()
                 lines = content.splitlines()
@@ -720,8 +633,10 @@ class AudioMetadataExtractor(MetadataExtractor):
         else:
             metadata["mutagen_status"] = "Mutagen library not available"
 
-        # Extract metadata using hachoir if available
-        if HACHOIR_AVAILABLE:
+        # Hachoir walks the whole container, so the fast profile leaves it out
+        if self.profile == FAST_PROFILE:
+            metadata["hachoir_status"] = "Skipped by the fast profile"
+        elif HACHOIR_AVAILABLE:
             try:
                 parser = hachoir.parser.createParser(file_path)
                 if parser:
@@ -742,7 +657,9 @@ class AudioMetadataExtractor(MetadataExtractor):
         # Extract metadata using pymediainfo if available
         if MEDIAINFO_AVAILABLE:
             try:
-                media_info = pymediainfo.MediaInfo.parse(file_path)
+                # A parse speed of 0 reads only the stream headers
+                media_info = pymediainfo.MediaInfo.parse(
+                    file_path, parse_speed=0 if self.profile == FAST_PROFILE else 0.5)
                 for track in media_info.tracks:
                     if track.track_type == 'Audio':
                         for key, value in track.__dict__.items():
@@ -785,7 +702,9 @@ class VideoMetadataExtractor(MetadataExtractor):
         # Extract metadata using pymediainfo if available
         if MEDIAINFO_AVAILABLE:
             try:
-                media_info = pymediainfo.MediaInfo.parse(file_path)
+                # A parse speed of 0 reads only the stream headers
+                media_info = pymediainfo.MediaInfo.parse(
+                    file_path, parse_speed=0 if self.profile == FAST_PROFILE else 0.5)
 
                 # Process general track
                 for track in media_info.tracks:
@@ -871,8 +790,10 @@ class VideoMetadataExtractor(MetadataExtractor):
         else:
             metadata["mediainfo_status"] = "MediaInfo library not available"
 
-        # Extract metadata using hachoir if available
-        if HACHOIR_AVAILABLE:
+        # Hachoir walks the whole container, so the fast profile leaves it out
+        if self.profile == FAST_PROFILE:
+            metadata["hachoir_status"] = "Skipped by the fast profile"
+        elif HACHOIR_AVAILABLE:
             try:
                 parser = hachoir.parser.createParser(file_path)
                 if parser:
@@ -900,62 +821,106 @@ class VideoMetadataExtractor(MetadataExtractor):
         return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
 
 
-def get_extractor_for_file(file_path):
+# Extractor classes in match order. A file matches an entry if its MIME type
+# is listed, starts with one of the prefixes, or its extension is listed.
+EXTRACTOR_REGISTRY = []
+
+
+def register_extractor(extractor_class, mime_types=(), mime_prefixes=(), extensions=()):
+    """
+    Register an extractor class for a set of MIME types and extensions.
+
+    Entries are matched in registration order, so more specific extractors
+    must be registered before broader ones.
+
+    Args:
+        extractor_class (type): MetadataExtractor subclass
+        mime_types (iterable, optional): Exact MIME types handled
+        mime_prefixes (iterable, optional): MIME type prefixes handled, e.g. 'image/'
+        extensions (iterable, optional): File extensions handled, without the dot
+    """
+    EXTRACTOR_REGISTRY.append((extractor_class, frozenset(mime_types), tuple(mime_prefixes), frozenset(extensions)))
+
+
+register_extractor(ImageMetadataExtractor, mime_prefixes=['image/'])
+register_extractor(PDFMetadataExtractor, mime_types=['application/pdf'], extensions=['pdf'])
+register_extractor(DocxMetadataExtractor,
+                   mime_types=['application/vnd.openxmlformats-officedocument.wordprocessingml.document'],
+                   extensions=['docx'])
+register_extractor(ExcelMetadataExtractor,
+                   mime_types=['application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+                               'application/vnd.ms-excel'],
+                   extensions=['xlsx', 'xls'])
+register_extractor(TextMetadataExtractor, mime_prefixes=['text/'],
+                   extensions=['txt', 'csv', 'md', 'json', 'xml', 'html'])
+register_extractor(AudioMetadataExtractor, mime_prefixes=['audio/'],
+                   extensions=['mp3', 'wav', 'flac', 'ogg', 'oga', 'm4a', 'aac'])
+register_extractor(VideoMetadataExtractor, mime_prefixes=['video/'],
+                   extensions=['mp4', 'avi', 'mov', 'mkv', 'webm', 'flv', 'wmv'])
+
+
+def get_extractor_for_file(file_path, profile=STANDARD_PROFILE, mime_type=None):
     """
     Determine the appropriate extractor based on the file type.
 
     Args:
         file_path (str): Path to the file
+        profile (str, optional): Extraction profile. Defaults to 'standard'.
+        mime_type (str, optional): MIME type already detected for the file.
+            Sniffed from the file's leading bytes if not given.
 
     Returns:
         MetadataExtractor: An instance of the appropriate extractor class
     """
-    mime = magic.Magic(mime=True)
-    mime_type = mime.from_file(file_path)
+    if mime_type is None:
+        mime_type = sniff_mime_type(file_path)
     extension = os.path.splitext(file_path)[1].lower().lstrip('.')
 
     # Determine extractor based on MIME type and extension
-    if mime_type.startswith('image/'):
-        return ImageMetadataExtractor()
-    elif mime_type == 'application/pdf' or extension == 'pdf':
-        return PDFMetadataExtractor()
-    elif mime_type == 'application/vnd.openxmlformats-officedocument.wordprocessingml.document' or extension == 'docx':
-        return DocxMetadataExtractor()
-    elif mime_type in ['application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-                      'application/vnd.ms-excel'] or extension in ['xlsx', 'xls']:
-        return ExcelMetadataExtractor()
-    elif mime_type.startswith('text/') or extension in ['txt', 'csv', 'md', 'json', 'xml', 'html']:
-        return TextMetadataExtractor()
-    elif mime_type.startswith('audio/') or extension in ['mp3', 'wav', 'flac', 'ogg', 'oga', 'm4a', 'aac']:
-        return AudioMetadataExtractor()
-    elif mime_type.startswith('video/') or extension in ['mp4', 'avi', 'mov', 'mkv', 'webm', 'flv', 'wmv']:
-        return VideoMetadataExtractor()
-    else:
-        # Default to a basic metadata extractor
-        return MetadataExtractor()
-
-
-def extract_metadata(file_path):
+    for extractor_class, mime_types, mime_prefixes, extensions in EXTRACTOR_REGISTRY:
+        if mime_type in mime_types or mime_type.startswith(mime_prefixes) or extension in extensions:
+            return extractor_class(profile)
+
+    # Default to a basic metadata extractor
+    return MetadataExtractor(profile)
+
+
+def extract_metadata(file_path, profile=STANDARD_PROFILE, mime_type=None):
     """
     Extract metadata from a file using the appropriate extractor.
 
     Args:
         file_path (str): Path to the file
+        profile (str, optional): Extraction profile, one of EXTRACTION_PROFILES.
+            Defaults to 'standard'.
+        mime_type (str, optional): MIME type already detected for the file,
+            so it is not sniffed again. Defaults to None.
 
     Returns:
         dict: Dictionary containing metadata
+
+    Raises:
+        ValueError: If the profile is not recognised
     """
-    extractor = get_extractor_for_file(file_path)
+    if profile not in EXTRACTION_PROFILES:
+        raise ValueError(f"Unsupported extraction profile: {profile}")
+
+    if mime_type is None:
+        mime_type = sniff_mime_type(file_path)
+
+    extractor = get_extractor_for_file(file_path, profile, mime_type)
     try:
         metadata = extractor.extract(file_path)
+        metadata["extraction_profile"] = profile
         return metadata
     except NotImplementedError:
         # If using the base extractor, return basic file info
         return {
             "extracted_by": "BasicFileInfo",
+            "extraction_profile": profile,
             "file_info": {
                 "file_size": os.path.getsize(file_path),
-                "mime_type": magic.Magic(mime=True).from_file(file_path),
+                "mime_type": mime_type,
                 "extension": os.path.splitext(file_path)[1].lower().lstrip('.'),
                 "last_modified": time.ctime(os.path.getmtime(file_path)),
                 "created": time.ctime(os.path.getctime(file_path))
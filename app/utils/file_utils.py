@@ -7,7 +7,30 @@ import hashlib
 import time
 import mimetypes
 import json
+import threading
 from flask import current_app
+from app.utils.hashing import BackgroundHasher, hash_file
+
+# File locks for claiming stored files are only available on POSIX
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+# Leading bytes handed to libmagic; enough for OOXML containers to be told apart
+SNIFF_BYTES = 16 * 1024
+
+# Bytes read per chunk when streaming uploads to disk
+STORE_CHUNK_SIZE = 1024 * 1024
+
+# Shard directories under the upload folder: SHARD_DEPTH levels named by
+# successive SHARD_WIDTH-character slices of the content hash
+SHARD_DEPTH = 2
+SHARD_WIDTH = 2
+
+# libmagic handles are not thread-safe, so each thread keeps its own
+_magic_local = threading.local()
 
 def allowed_file(filename):
     """
@@ -83,6 +106,35 @@ def get_safe_filename(filename):
     
     return unique_name
 
+def get_magic():
+    """
+    Get this thread's libmagic handle, creating it on first use.
+
+    Returns:
+        magic.Magic: MIME-type detector owned by the calling thread
+    """
+    detector = getattr(_magic_local, 'detector', None)
+    if detector is None:
+        detector = magic.Magic(mime=True)
+        _magic_local.detector = detector
+    return detector
+
+def sniff_mime_type(file_path=None, buffer=None):
+    """
+    Detect the MIME type of a file from its leading bytes.
+
+    Args:
+        file_path (str, optional): Path to the file, read only if no buffer is given
+        buffer (bytes, optional): Leading bytes of the file (SNIFF_BYTES is enough)
+
+    Returns:
+        str: Detected MIME type
+    """
+    if buffer is None:
+        with open(file_path, 'rb') as f:
+            buffer = f.read(SNIFF_BYTES)
+    return get_magic().from_buffer(buffer[:SNIFF_BYTES])
+
 def ensure_upload_dir():
     """
     Ensure the upload directory exists.
@@ -95,43 +147,300 @@ def ensure_upload_dir():
         os.makedirs(upload_dir)
     return upload_dir
 
-def save_uploaded_file(file, directory=None):
+def get_content_path(content_hash, extension=None, directory=None):
     """
-    Save an uploaded file to disk.
-    
+    Get the storage path for a file's contents.
+
+    Files are stored under their SHA-256 digest, so identical uploads share
+    one copy on disk. The digest's leading characters pick nested shard
+    directories (uploads/ab/cd/abcd...) so no single directory grows huge.
+
+    Args:
+        content_hash (str): SHA-256 hex digest of the contents
+        extension (str, optional): File extension without the dot
+        directory (str, optional): Subdirectory of the upload folder
+
+    Returns:
+        str: Absolute path for the content
+    """
+    upload_dir = ensure_upload_dir()
+    if directory:
+        upload_dir = os.path.join(upload_dir, directory)
+    shards = [content_hash[i * SHARD_WIDTH:(i + 1) * SHARD_WIDTH] for i in range(SHARD_DEPTH)]
+    name = f"{content_hash}.{extension}" if extension else content_hash
+    return os.path.join(upload_dir, *shards, name)
+
+def resolve_stored_path(file_path, content_hash=None):
+    """
+    Find a stored file on disk, whichever upload layout it was saved in.
+
+    Records keep the path they were saved with. If that path is gone (the
+    file was moved into the sharded layout, or the upload folder itself was
+    moved) the file is looked for at its sharded location and then directly
+    in the upload folder.
+
+    Args:
+        file_path (str): Path recorded for the file
+        content_hash (str, optional): SHA-256 of the contents
+
+    Returns:
+        str: Path of the file on disk, or file_path unchanged if it cannot be found
+    """
+    if os.path.exists(file_path):
+        return file_path
+
+    extension = os.path.splitext(file_path)[1].lstrip('.') or None
+    candidates = []
+    if content_hash:
+        candidates.append(get_content_path(content_hash, extension))
+    candidates.append(os.path.join(ensure_upload_dir(), os.path.basename(file_path)))
+
+    for candidate in candidates:
+        if os.path.exists(candidate):
+            return candidate
+    return file_path
+
+class StoredFileClaim:
+    """
+    Lock on a stored file, held through its open descriptor.
+
+    Ingest takes a shared lock on the file it stored or reused and keeps it
+    until the File record pointing at it is committed or the upload is
+    abandoned; remove_unreferenced_file needs an exclusive lock, so it never
+    deletes a file an in-flight ingest has claimed. flock locks cover every
+    process on the host and are dropped when the descriptor is closed, so a
+    claim that is never released explicitly ends when it is garbage collected.
+    """
+
+    def __init__(self, fd):
+        self._fd = fd
+
+    def release(self):
+        """Release the lock. Safe to call more than once."""
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def __del__(self):
+        self.release()
+
+
+def _lock_stored_file(file_path, exclusive):
+    """
+    Open and lock a stored file.
+
+    Args:
+        file_path (str): Path of the stored file
+        exclusive (bool): Take an exclusive lock without waiting, instead of
+            waiting for a shared one
+
+    Returns:
+        StoredFileClaim: The held lock, or None if the file is missing, was
+            replaced while locking, or (exclusive) is claimed by someone else
+    """
+    try:
+        fd = os.open(file_path, os.O_RDONLY)
+    except FileNotFoundError:
+        return None
+    claim = StoredFileClaim(fd)
+    if FCNTL_AVAILABLE:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB if exclusive else fcntl.LOCK_SH)
+        except BlockingIOError:
+            claim.release()
+            return None
+    # A remover may have unlinked the file, or a new copy been renamed into
+    # place, between opening and locking it
+    try:
+        current = os.stat(file_path)
+    except FileNotFoundError:
+        current = None
+    locked = os.fstat(fd)
+    if current is None or (current.st_dev, current.st_ino) != (locked.st_dev, locked.st_ino):
+        claim.release()
+        return None
+    return claim
+
+def claim_stored_file(file_path):
+    """
+    Claim a stored file so it is not removed before its record is committed.
+
+    Args:
+        file_path (str): Path of the stored file
+
+    Returns:
+        StoredFileClaim: The claim, or None if the file does not exist
+    """
+    return _lock_stored_file(file_path, exclusive=False)
+
+def lock_unclaimed_file(file_path):
+    """
+    Lock a stored file for removal if no ingest has claimed it.
+
+    Args:
+        file_path (str): Path of the stored file
+
+    Returns:
+        StoredFileClaim: Exclusive lock to release after removing the file,
+            or None if the file is claimed or missing
+    """
+    return _lock_stored_file(file_path, exclusive=True)
+
+def release_claim(stored):
+    """
+    Release the claim store_stream took on a stored file.
+
+    Args:
+        stored (dict): Result of store_stream or ingest_upload, or a batch entry
+    """
+    claim = stored.get('claim') if stored else None
+    if claim is not None:
+        claim.release()
+
+def store_stream(stream, extension=None, directory=None):
+    """
+    Write a stream to content-addressed storage in a single pass.
+
+    Everything needed about the upload is worked out while it is written: the
+    forensic digests (see app.utils.hashing), the byte count and the MIME
+    type, which is sniffed from the first block. The data goes to a
+    temporary file next to its destination and is renamed into place once its
+    hash is known. If the content is already stored the temporary copy is
+    discarded and the existing file is reused.
+
+    Either way the stored file is claimed (see StoredFileClaim) so a
+    concurrent remove_unreferenced_file cannot delete it before the caller
+    has committed its record. Callers release the claim with release_claim
+    once the record is committed or the upload is dropped.
+
+    Args:
+        stream: Readable binary file object
+        extension (str, optional): File extension without the dot
+        directory (str, optional): Subdirectory of the upload folder
+
+    Returns:
+        dict: file_path, content_hash (SHA-256), file_size, mime_type,
+            hashes (sha256, sha1, md5 and tlsh) and claim
+    """
+    upload_dir = ensure_upload_dir()
+    if directory:
+        upload_dir = os.path.join(upload_dir, directory)
+        os.makedirs(upload_dir, exist_ok=True)
+
+    hasher = BackgroundHasher()
+    file_size = 0
+    head = b''
+    temp_path = os.path.join(upload_dir, f".upload_{uuid.uuid4().hex}.tmp")
+    try:
+        with open(temp_path, 'wb') as f:
+            for chunk in iter(lambda: stream.read(STORE_CHUNK_SIZE), b''):
+                if len(head) < SNIFF_BYTES:
+                    head += chunk[:SNIFF_BYTES - len(head)]
+                hasher.update(chunk)
+                f.write(chunk)
+                file_size += len(chunk)
+
+        hashes = hasher.hexdigests()
+        file_path = get_content_path(hashes['sha256'], extension, directory)
+        claim = None
+        for _ in range(3):
+            claim = claim_stored_file(file_path)
+            if claim is not None:
+                break
+            # Not stored yet: claim the new copy before it becomes visible at
+            # its content path. Linking rather than renaming never replaces a
+            # copy another upload has just stored and claimed.
+            claim = claim_stored_file(temp_path)
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            try:
+                os.link(temp_path, file_path)
+                break
+            except (FileExistsError, FileNotFoundError):
+                # Stored by another upload first, or its shard directory was
+                # pruned by a concurrent delete; try again
+                claim.release()
+                claim = None
+            except OSError:
+                # No hard links on this filesystem
+                os.replace(temp_path, file_path)
+                break
+        if claim is None:
+            raise OSError(f"Could not store {file_path}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    return {
+        'file_path': file_path,
+        'content_hash': hashes['sha256'],
+        'file_size': file_size,
+        'mime_type': sniff_mime_type(buffer=head),
+        'hashes': hashes,
+        'claim': claim
+    }
+
+def store_local_file(source_path, extension=None, directory=None):
+    """
+    Copy a local file into content-addressed storage.
+
+    Args:
+        source_path (str): Path of the file to store
+        extension (str, optional): File extension without the dot
+        directory (str, optional): Subdirectory of the upload folder
+
+    Returns:
+        dict: As returned by store_stream
+    """
+    with open(source_path, 'rb') as f:
+        return store_stream(f, extension, directory)
+
+def ingest_upload(file, directory=None):
+    """
+    Save an uploaded file to content-addressed storage.
+
+    The upload is read once: hashing, sizing and MIME detection all happen
+    while it is written, so nothing reads the stored file back afterwards.
+
     Args:
         file: Flask file object
         directory (str, optional): Subdirectory to save in. Defaults to None.
-        
+
     Returns:
-        tuple: (saved_path, original_filename, safe_filename, file_size, mime_type)
+        dict: As returned by store_stream, plus original_filename and
+            safe_filename; None if there is no file
     """
     if not file:
         return None
-    
-    # Ensure the filename is safe
+
     original_filename = file.filename
-    safe_filename = get_safe_filename(original_filename)
-    
-    # Create base upload directory
-    upload_dir = ensure_upload_dir()
-    
-    # Create subdirectory if specified
-    if directory:
-        upload_dir = os.path.join(upload_dir, directory)
-        if not os.path.exists(upload_dir):
-            os.makedirs(upload_dir)
-    
-    # Save the file
-    file_path = os.path.join(upload_dir, safe_filename)
-    file.save(file_path)
-    
-    # Get file details
-    file_size = os.path.getsize(file_path)
-    mime = magic.Magic(mime=True)
-    mime_type = mime.from_file(file_path)
-    
-    return file_path, original_filename, safe_filename, file_size, mime_type
+    secure_name = secure_filename(original_filename)
+    extension = secure_name.rsplit('.', 1)[1].lower() if '.' in secure_name else None
+
+    stored = store_stream(file.stream, extension, directory)
+    stored['original_filename'] = original_filename
+    stored['safe_filename'] = os.path.basename(stored['file_path'])
+    return stored
+
+def save_uploaded_file(file, directory=None):
+    """
+    Save an uploaded file to content-addressed storage.
+
+    Args:
+        file: Flask file object
+        directory (str, optional): Subdirectory to save in. Defaults to None.
+
+    Returns:
+        tuple: (saved_path, original_filename, safe_filename, file_size, mime_type, content_hash)
+    """
+    stored = ingest_upload(file, directory)
+    if stored is None:
+        return None
+
+    return (stored['file_path'], stored['original_filename'], stored['safe_filename'],
+            stored['file_size'], stored['mime_type'], stored['content_hash'])
 
 def calculate_file_hash(file_path, hash_algorithm="sha256"):
     """
@@ -145,11 +454,7 @@ def calculate_file_hash(file_path, hash_algorithm="sha256"):
         str: Hexadecimal digest of the file hash
     """
     try:
-        hash_obj = hashlib.new(hash_algorithm)
-        with open(file_path, 'rb') as f:
-            for chunk in iter(lambda: f.read(4096), b''):
-                hash_obj.update(chunk)
-        return hash_obj.hexdigest()
+        return hash_file(file_path, (hash_algorithm,), fuzzy=False)[hash_algorithm]
     except Exception as e:
         return f"Error calculating hash: {str(e)}"
 
@@ -0,0 +1,135 @@
+"""
+Forensic file hashing.
+
+Every stored file gets SHA-256 (its content hash), SHA-1 and MD5, plus a TLSH
+similarity hash when py-tlsh is installed. All digests are fed from the same
+read: uploads are hashed chunk by chunk while they are written, with the
+digest work handed to a background thread so it overlaps the disk I/O, and
+files already on disk are read once into a reusable buffer.
+"""
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+# TLSH similarity hashing is optional
+try:
+    import tlsh
+    TLSH_AVAILABLE = True
+except ImportError:
+    TLSH_AVAILABLE = False
+
+# Cryptographic digests computed for every file; sha256 is the content hash
+HASH_ALGORITHMS = ('sha256', 'sha1', 'md5')
+
+# Bytes read per chunk when hashing files already on disk
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Threads that run digest updates for concurrent uploads
+HASH_WORKERS = 4
+
+_hash_executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix='hashing')
+
+
+class MultiHasher:
+    """Feed one stream of bytes into several digests at once."""
+
+    def __init__(self, algorithms=HASH_ALGORITHMS, fuzzy=True):
+        self._digests = {algorithm: hashlib.new(algorithm) for algorithm in algorithms}
+        self._tlsh = tlsh.Tlsh() if fuzzy and TLSH_AVAILABLE else None
+
+    def update(self, data):
+        """
+        Add data to every digest.
+
+        Args:
+            data (bytes): Next chunk of the stream
+        """
+        for digest in self._digests.values():
+            digest.update(data)
+        if self._tlsh is not None:
+            self._tlsh.update(bytes(data))
+
+    def hexdigests(self):
+        """
+        Finish hashing.
+
+        Returns:
+            dict: algorithm -> hex digest, with 'tlsh' set to the similarity
+                hash (None if py-tlsh is missing or the data is too short or
+                uniform to hash)
+        """
+        hashes = {algorithm: digest.hexdigest() for algorithm, digest in self._digests.items()}
+        hashes['tlsh'] = None
+        if self._tlsh is not None:
+            try:
+                self._tlsh.final()
+                fuzzy_hash = self._tlsh.hexdigest()
+                # TLSH needs at least 50 bytes with some variety
+                if fuzzy_hash and fuzzy_hash != 'TNULL':
+                    hashes['tlsh'] = fuzzy_hash
+            except ValueError:
+                pass
+        return hashes
+
+
+class BackgroundHasher:
+    """
+    MultiHasher whose updates run on the hashing thread pool.
+
+    hashlib releases the GIL for large buffers, so hashing one chunk proceeds
+    while the caller writes it and reads the next. At most one chunk is in
+    flight, which keeps the updates in order and memory bounded.
+    """
+
+    def __init__(self, algorithms=HASH_ALGORITHMS, fuzzy=True):
+        self._hasher = MultiHasher(algorithms, fuzzy)
+        self._pending = None
+
+    def update(self, data):
+        """
+        Queue data for hashing, waiting for the previous chunk first.
+
+        Args:
+            data (bytes): Next chunk of the stream
+        """
+        self._wait()
+        self._pending = _hash_executor.submit(self._hasher.update, data)
+
+    def _wait(self):
+        if self._pending is not None:
+            self._pending.result()
+            self._pending = None
+
+    def hexdigests(self):
+        """
+        Wait for outstanding chunks and finish hashing.
+
+        Returns:
+            dict: As returned by MultiHasher.hexdigests
+        """
+        self._wait()
+        return self._hasher.hexdigests()
+
+
+def hash_file(file_path, algorithms=HASH_ALGORITHMS, fuzzy=True):
+    """
+    Compute several digests of a file in one read.
+
+    Args:
+        file_path (str): Path to the file
+        algorithms (iterable, optional): hashlib algorithm names
+        fuzzy (bool, optional): Also compute the TLSH similarity hash
+
+    Returns:
+        dict: As returned by MultiHasher.hexdigests
+    """
+    hasher = MultiHasher(algorithms, fuzzy)
+    buffer = bytearray(HASH_CHUNK_SIZE)
+    view = memoryview(buffer)
+    with open(file_path, 'rb', buffering=0) as f:
+        while True:
+            read = f.readinto(buffer)
+            if not read:
+                break
+            hasher.update(view[:read])
+    return hasher.hexdigests()
+
@@ -0,0 +1,360 @@
+"""
+Asynchronous metadata extraction jobs.
+
+A job is recorded in the database as soon as its file is saved, and the
+request returns straight away. Job threads hand the file to the extraction
+worker pool, store the result as File and Metadata records, and update the
+job's stage, progress and per-stage timings as they go so clients can poll it.
+"""
+import datetime
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from app.config import app_config
+from app.models.metadata import File, Metadata, ExtractionJob
+from app.utils.database import SessionLocal
+from app.utils.dedup import find_duplicate, remove_unreferenced_file
+from app.utils.extraction_pool import get_extraction_pool, timeout_metadata, ExtractionTimeout
+
+# Job statuses
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+# Pipeline stages and the progress reported once each has started
+STAGE_PROGRESS = {
+    "queued": 0,
+    "extracting": 10,
+    "storing": 90,
+    "done": 100
+}
+
+
+class JobQueueFull(Exception):
+    """Raised when too many jobs are already running or queued."""
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# Bounds the jobs running or waiting in the executor, whose own queue is unbounded
+_job_slots = threading.BoundedSemaphore(app_config.EXTRACTION_WORKERS + app_config.JOB_QUEUE_DEPTH)
+
+# Identity of this process as recorded on the jobs it runs, keyed by pid so a
+# forked worker does not inherit its parent's
+_owner = (None, None)
+
+
+def _job_owner():
+    """Get the owner string recorded on jobs run by this process."""
+    global _owner
+    pid = os.getpid()
+    if _owner[0] != pid:
+        _owner = (pid, f"{socket.gethostname()}:{pid}:{uuid.uuid4().hex[:8]}")
+    return _owner[1]
+
+
+def _owner_alive(owner):
+    """
+    Check whether the process that owns a job may still be running it.
+
+    Only processes on this host can be checked; jobs owned elsewhere are
+    assumed to be alive.
+
+    Args:
+        owner (str): Owner recorded on the job, or None for jobs from before owners existed
+
+    Returns:
+        bool: False if the owning process is known to be gone
+    """
+    if not owner:
+        return False
+    try:
+        host, pid, _ = owner.rsplit(':', 2)
+        pid = int(pid)
+    except ValueError:
+        return False
+    if host != socket.gethostname():
+        return True
+    if pid == os.getpid():
+        # An earlier process that had this pid, not us
+        return owner == _job_owner()
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _get_executor():
+    """Get the shared job executor, failing over any jobs orphaned by a restart."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _fail_interrupted_jobs()
+            # One thread per extraction worker keeps the pool busy without flooding it
+            _executor = ThreadPoolExecutor(
+                max_workers=app_config.EXTRACTION_WORKERS,
+                thread_name_prefix='extraction-job'
+            )
+        return _executor
+
+
+def _fail_interrupted_jobs():
+    """
+    Mark jobs left queued or running by a process that has exited as failed.
+
+    Jobs owned by sibling worker processes that are still alive are left alone.
+    """
+    db = SessionLocal()
+    try:
+        unfinished = db.query(ExtractionJob.id, ExtractionJob.owner) \
+            .filter(ExtractionJob.status.in_([QUEUED, RUNNING])).all()
+        orphaned = [job_id for job_id, owner in unfinished if not _owner_alive(owner)]
+        if orphaned:
+            db.query(ExtractionJob).filter(ExtractionJob.id.in_(orphaned),
+                                           ExtractionJob.status.in_([QUEUED, RUNNING])).update({
+                ExtractionJob.status: FAILED,
+                ExtractionJob.error: "Job was interrupted by a server restart",
+                ExtractionJob.finished_at: datetime.datetime.utcnow()
+            }, synchronize_session=False)
+            db.commit()
+    except Exception as e:
+        logging.error(f"Error failing interrupted extraction jobs: {str(e)}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+def submit_extraction_job(db, file_path, original_filename, safe_filename, file_size, mime_type,
+                          file_extension, profile, upload_ms=0, hashes=None):
+    """
+    Record an extraction job for a saved file and queue it.
+
+    Args:
+        db (Session): Database session
+        file_path (str): Path to the saved file
+        original_filename (str): Filename as uploaded
+        safe_filename (str): Filename on disk
+        file_size (int): File size in bytes
+        mime_type (str): Detected MIME type
+        file_extension (str): File extension without the dot
+        profile (str): Extraction profile
+        upload_ms (int, optional): Time spent receiving and saving the upload
+        hashes (dict, optional): File digests from ingest; sha256 is used to reuse earlier results
+
+    Returns:
+        ExtractionJob: The queued job
+
+    Raises:
+        JobQueueFull: If too many jobs are already running or queued
+    """
+    # Start the executor first so its restart cleanup cannot touch this job
+    executor = _get_executor()
+    if not _job_slots.acquire(blocking=False):
+        raise JobQueueFull("Too many extraction jobs in progress, try again later")
+
+    job = ExtractionJob(
+        id=uuid.uuid4().hex,
+        status=QUEUED,
+        stage="queued",
+        progress=STAGE_PROGRESS["queued"],
+        profile=profile,
+        original_filename=original_filename,
+        safe_filename=safe_filename,
+        file_path=file_path,
+        file_size=file_size,
+        mime_type=mime_type,
+        file_extension=file_extension,
+        owner=_job_owner(),
+        content_hash=(hashes or {}).get('sha256'),
+        file_hashes=hashes,
+        stage_timings={"upload": upload_ms}
+    )
+    try:
+        db.add(job)
+        db.commit()
+        executor.submit(_run_job, job.id)
+    except Exception:
+        _job_slots.release()
+        raise
+    return job
+
+
+def _set_stage(db, job, stage, timings):
+    """Move a job to a new stage and persist it."""
+    job.stage = stage
+    job.progress = STAGE_PROGRESS[stage]
+    # Assign a copy so the JSON column is flagged as changed
+    job.stage_timings = dict(timings)
+    db.commit()
+
+
+def _extract(job):
+    """Run the job's extraction in the worker pool, waiting while the pool is saturated."""
+    pool = get_extraction_pool()
+    try:
+        # The executor already bounds job concurrency, so wait rather than fail
+        return pool.extract(job.file_path, job.profile, job.mime_type, block=True)
+    except ExtractionTimeout:
+        logging.warning(f"Metadata extraction timed out for job {job.id}: {job.original_filename}")
+        return timeout_metadata(job.file_size, job.mime_type, job.file_extension, pool.timeout)
+
+
+def _fail_job(db, job_id, error, timings=None):
+    """
+    Mark a job failed and remove its file unless something else keeps it.
+
+    Args:
+        db (Session): Database session, rolled back by the caller
+        job_id (str): ID of the job
+        error (str): Error reported to clients
+        timings (dict, optional): Stage timings recorded so far
+    """
+    values = {
+        ExtractionJob.status: FAILED,
+        ExtractionJob.error: error,
+        ExtractionJob.finished_at: datetime.datetime.utcnow()
+    }
+    if timings is not None:
+        values[ExtractionJob.stage_timings] = dict(timings)
+    db.query(ExtractionJob).filter(ExtractionJob.id == job_id).update(values, synchronize_session=False)
+    db.commit()
+
+    file_path = db.query(ExtractionJob.file_path).filter(ExtractionJob.id == job_id).scalar()
+    if file_path:
+        # Once the job is failed it no longer holds the file
+        remove_unreferenced_file(db, file_path)
+
+
+def _run_job(job_id):
+    """
+    Execute an extraction job and store its results.
+
+    Every run ends with the job completed or failed; whatever goes wrong,
+    it is not left queued or running.
+
+    Args:
+        job_id (str): ID of the job to run
+    """
+    db = SessionLocal()
+    timings = None
+    try:
+        job = db.query(ExtractionJob).filter(ExtractionJob.id == job_id).first()
+        if not job:
+            return
+
+        timings = dict(job.stage_timings or {})
+        job.status = RUNNING
+        job.started_at = datetime.datetime.utcnow()
+        job.error = None
+        job.finished_at = None
+        # Time spent waiting for a job thread
+        timings["queued"] = int((job.started_at - job.created_at).total_seconds() * 1000)
+
+        # Identical contents already extracted with this profile: point at that record
+        duplicate = find_duplicate(db, job.content_hash, job.profile)
+        if duplicate:
+            job.file_id = duplicate[0].id
+            job.status = COMPLETED
+            job.finished_at = datetime.datetime.utcnow()
+            _set_stage(db, job, "done", timings)
+            # Only once the job is finished does it stop holding the file
+            remove_unreferenced_file(db, job.file_path)
+            return
+
+        _set_stage(db, job, "extracting", timings)
+
+        start_time = time.time()
+        metadata_dict = _extract(job)
+        timings["extracting"] = int((time.time() - start_time) * 1000)
+        _set_stage(db, job, "storing", timings)
+
+        start_time = time.time()
+        db_file = File(
+            filename=job.safe_filename,
+            original_filename=job.original_filename,
+            file_path=job.file_path,
+            file_size=job.file_size,
+            mime_type=job.mime_type,
+            file_extension=job.file_extension
+        )
+        db_file.apply_hashes(job.file_hashes or {'sha256': job.content_hash})
+        db.add(db_file)
+        db.flush()  # Get the file ID
+
+        extracted_text = metadata_dict.get('extracted_text', '')
+        if not extracted_text and 'text_preview' in metadata_dict:
+            extracted_text = metadata_dict.get('text_preview', '')
+
+        metadata_type = metadata_dict.get('extracted_by', '').replace('MetadataExtractor', '').lower()
+        if not metadata_type:
+            metadata_type = 'generic'
+
+        # Worker results are already plain JSON types
+        db.add(Metadata(
+            file_id=db_file.id,
+            metadata_type=metadata_type,
+            metadata_json=metadata_dict,
+            extraction_duration=metadata_dict.get('extraction_duration', metadata_dict.get('extraction_time_ms', 0)),
+            extracted_text=extracted_text
+        ))
+
+        job.file_id = db_file.id
+        job.status = COMPLETED
+        job.finished_at = datetime.datetime.utcnow()
+        timings["storing"] = int((time.time() - start_time) * 1000)
+        _set_stage(db, job, "done", timings)
+
+    except Exception as e:
+        logging.error(f"Extraction job {job_id} failed: {str(e)}")
+        db.rollback()
+        try:
+            _fail_job(db, job_id, str(e), timings)
+        except Exception as fail_error:
+            logging.error(f"Error recording failure of extraction job {job_id}: {str(fail_error)}")
+            db.rollback()
+    finally:
+        db.close()
+        _job_slots.release()
+
+
+def job_status(job):
+    """
+    Build the API representation of a job.
+
+    Args:
+        job (ExtractionJob): Job record
+
+    Returns:
+        dict: Job status, progress, stage timings and result location
+    """
+    status = {
+        'id': job.id,
+        'status': job.status,
+        'stage': job.stage,
+        'progress': job.progress,
+        'profile': job.profile,
+        'filename': job.original_filename,
+        'file_size': job.file_size,
+        'mime_type': job.mime_type,
+        'stage_timings_ms': job.stage_timings or {},
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None
+    }
+
+    if job.file_id:
+        status['file_id'] = job.file_id
+    if job.error:
+        status['error'] = job.error
+
+    return status
@@ -2,14 +2,17 @@
 Utility module for removing metadata from various file types.
 """
 import os
+import re
+import mmap
+import zlib
+import struct
+import zipfile
 import logging
 import tempfile
 import shutil
 from PIL import Image
 import io
 import PyPDF2
-import docx
-from docx.opc.constants import RELATIONSHIP_TYPE as RT
 
 # Import specialized libraries
 try:
@@ -52,6 +55,194 @@ class MetadataCleaner:
         raise NotImplementedError("Subclasses must implement clean method")
 
 
+# JPEG APPn segments kept by the byte-level cleaner: they affect how pixels
+# are decoded or displayed rather than describing the photo
+JPEG_KEEP_APP_SEGMENTS = {
+    0xE0: (b'JFIF\x00',),  # APP0: JFIF header, written back without its thumbnail
+    0xE2: (b'ICC_PROFILE\x00',),  # APP2: color profile
+    0xEE: (b'Adobe',),  # APP14: color transform for CMYK/YCCK images
+}
+
+# PNG chunks dropped by the byte-level cleaner
+PNG_METADATA_CHUNKS = {b'tEXt', b'zTXt', b'iTXt', b'eXIf', b'tIME'}
+
+# WebP chunks dropped by the byte-level cleaner, and their VP8X header flags
+WEBP_METADATA_CHUNKS = {b'EXIF': 0x08, b'XMP ': 0x04}
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+def _strip_jpeg(data, out):
+    """
+    Copy a JPEG without its metadata segments.
+
+    APP1 (EXIF, XMP), COM and other APPn segments are skipped, as is anything
+    after the end-of-image marker (e.g. appended preview images). Every other
+    segment and the entropy-coded scan data are copied byte for byte.
+
+    Args:
+        data (mmap.mmap): The whole file, mapped read-only
+        out: Binary file object to write to
+
+    Raises:
+        ValueError: If the file is not a well-formed JPEG
+    """
+    if data[:2] != b'\xff\xd8':
+        raise ValueError("Missing JPEG start-of-image marker")
+    # Slices of the view are written straight from the mapping without copying
+    with memoryview(data) as view:
+        out.write(view[:2])
+        pos = 2
+        size = len(data)
+
+        while pos < size:
+            if data[pos] != 0xFF:
+                raise ValueError(f"Expected JPEG marker at offset {pos}")
+            marker = data[pos + 1]
+            if marker == 0xFF:
+                # Fill byte before a marker
+                pos += 1
+                continue
+            if marker == 0xD9:
+                out.write(view[pos:pos + 2])
+                return
+            if 0xD0 <= marker <= 0xD7 or marker == 0x01:
+                # Standalone markers without a length
+                out.write(view[pos:pos + 2])
+                pos += 2
+                continue
+
+            length = int.from_bytes(data[pos + 2:pos + 4], 'big')
+            segment_end = pos + 2 + length
+            if length < 2 or segment_end > size:
+                raise ValueError(f"Truncated JPEG segment at offset {pos}")
+
+            if marker == 0xFE or 0xE0 <= marker <= 0xEF:
+                signatures = JPEG_KEEP_APP_SEGMENTS.get(marker, ())
+                keep = any(data[pos + 4:pos + 4 + len(signature)] == signature for signature in signatures)
+            else:
+                keep = True
+            if keep and marker == 0xE0 and length > 16:
+                # Keep version, units and density; drop the embedded thumbnail
+                out.write(b'\xff\xe0\x00\x10')
+                out.write(view[pos + 4:pos + 16])
+                out.write(b'\x00\x00')
+            elif keep:
+                out.write(view[pos:segment_end])
+            pos = segment_end
+
+            if marker == 0xDA:
+                # Scan data runs until the next marker that is not a stuffed
+                # 0xFF00 byte or a restart marker
+                scan_start = pos
+                while True:
+                    pos = data.find(b'\xff', pos)
+                    if pos < 0 or pos + 1 >= size:
+                        raise ValueError("JPEG scan data is not terminated")
+                    following = data[pos + 1]
+                    if following == 0x00 or 0xD0 <= following <= 0xD7:
+                        pos += 2
+                    elif following == 0xFF:
+                        pos += 1
+                    else:
+                        break
+                out.write(view[scan_start:pos])
+
+        raise ValueError("Missing JPEG end-of-image marker")
+
+
+def _strip_png(data, out):
+    """
+    Copy a PNG without its text, EXIF and timestamp chunks.
+
+    Args:
+        data (mmap.mmap): The whole file, mapped read-only
+        out: Binary file object to write to
+
+    Raises:
+        ValueError: If the file is not a well-formed PNG
+    """
+    if data[:8] != PNG_SIGNATURE:
+        raise ValueError("Missing PNG signature")
+    with memoryview(data) as view:
+        out.write(view[:8])
+        pos = 8
+        size = len(data)
+
+        while pos + 12 <= size:
+            length = int.from_bytes(data[pos:pos + 4], 'big')
+            chunk_type = bytes(data[pos + 4:pos + 8])
+            chunk_end = pos + 12 + length
+            if chunk_end > size:
+                raise ValueError(f"Truncated PNG chunk {chunk_type!r}")
+            if chunk_type not in PNG_METADATA_CHUNKS:
+                out.write(view[pos:chunk_end])
+            pos = chunk_end
+            if chunk_type == b'IEND':
+                return
+
+        raise ValueError("Missing PNG IEND chunk")
+
+
+def _strip_webp(data, out):
+    """
+    Copy a WebP without its EXIF and XMP chunks.
+
+    The VP8X header flags for the removed chunks are cleared and the RIFF
+    size is rewritten; image data chunks are copied unchanged.
+
+    Args:
+        data (mmap.mmap): The whole file, mapped read-only
+        out: Binary file object to write to (must be seekable)
+
+    Raises:
+        ValueError: If the file is not a well-formed WebP
+    """
+    if data[:4] != b'RIFF' or data[8:12] != b'WEBP':
+        raise ValueError("Missing WebP RIFF header")
+    with memoryview(data) as view:
+        size = min(len(data), 8 + int.from_bytes(data[4:8], 'little'))
+        out.write(view[:12])
+        written = 4  # 'WEBP'
+        pos = 12
+
+        while pos + 8 <= size:
+            chunk_type = bytes(data[pos:pos + 4])
+            length = int.from_bytes(data[pos + 4:pos + 8], 'little')
+            chunk_end = pos + 8 + length + (length & 1)
+            if pos + 8 + length > size:
+                raise ValueError(f"Truncated WebP chunk {chunk_type!r}")
+            chunk_end = min(chunk_end, size)
+
+            if chunk_type in WEBP_METADATA_CHUNKS:
+                pass  # Dropped
+            elif chunk_type == b'VP8X' and length >= 1:
+                flags = data[pos + 8] & ~sum(WEBP_METADATA_CHUNKS.values())
+                out.write(view[pos:pos + 8])
+                out.write(bytes([flags]))
+                out.write(view[pos + 9:chunk_end])
+                written += chunk_end - pos
+            else:
+                out.write(view[pos:chunk_end])
+                written += chunk_end - pos
+            pos = chunk_end
+
+        out.seek(4)
+        out.write(written.to_bytes(4, 'little'))
+        out.seek(0, os.SEEK_END)
+
+
+def _byte_level_stripper(header):
+    """Pick the byte-level stripper for a file's leading bytes, if there is one."""
+    if header[:2] == b'\xff\xd8':
+        return _strip_jpeg
+    if header[:8] == PNG_SIGNATURE:
+        return _strip_png
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return _strip_webp
+    return None
+
+
 class ImageMetadataCleaner(MetadataCleaner):
     """Clean metadata from image files."""
 
@@ -59,38 +250,66 @@ class ImageMetadataCleaner(MetadataCleaner):
         """
         Remove all metadata from an image file.
 
+        JPEG, PNG and WebP files are rewritten at the byte level: metadata
+        segments and chunks are dropped and the compressed image data is
+        copied untouched, so cleaning is lossless and takes time proportional
+        to the file size. Other formats are re-saved through Pillow.
+
         Args:
             file_path (str): Path to the image file
 
         Returns:
             tuple: (success, message, cleaned_file_path)
         """
+        temp_path = None
         try:
-            # Create a temporary file
-            temp_fd, temp_path = tempfile.mkstemp(suffix=os.path.splitext(file_path)[1])
+            # Create a temporary file next to the original so it can be renamed over it
+            temp_fd, temp_path = tempfile.mkstemp(suffix=os.path.splitext(file_path)[1],
+                                                  dir=os.path.dirname(os.path.abspath(file_path)))
             os.close(temp_fd)
 
-            # Open the image and save it without metadata
-            with Image.open(file_path) as img:
-                # Create a new image with the same content but without metadata
-                data = list(img.getdata())
-                img_without_exif = Image.new(img.mode, img.size)
-                img_without_exif.putdata(data)
-                
-                # Save the new image
-                img_without_exif.save(temp_path)
+            with open(file_path, 'rb') as f:
+                stripper = _byte_level_stripper(f.read(12))
+
+            message = None
+            if stripper is not None:
+                try:
+                    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data, \
+                            open(temp_path, 'wb') as out:
+                        stripper(data, out)
+                    message = "Successfully removed metadata from image without re-encoding"
+                except ValueError as e:
+                    logging.warning(f"Byte-level cleaning failed for {file_path}, re-encoding instead: {str(e)}")
+
+            if message is None:
+                self._reencode(file_path, temp_path)
+                message = "Successfully removed metadata from image"
 
             # Replace the original file with the cleaned one
-            shutil.move(temp_path, file_path)
-            
-            return True, "Successfully removed metadata from image", file_path
+            os.replace(temp_path, file_path)
+
+            return True, message, file_path
         except Exception as e:
             logging.error(f"Error cleaning image metadata: {str(e)}")
             # Clean up temp file if it exists
-            if 'temp_path' in locals() and os.path.exists(temp_path):
+            if temp_path and os.path.exists(temp_path):
                 os.remove(temp_path)
             return False, f"Error cleaning metadata: {str(e)}", file_path
 
+    def _reencode(self, file_path, temp_path):
+        """Save a copy of the image's pixels, leaving its metadata behind."""
+        with Image.open(file_path) as img:
+            image_format = img.format
+            # copy() carries the pixels and palette but no EXIF or TIFF tags
+            img_without_exif = img.copy()
+            transparency = img.info.get('transparency')
+
+        img_without_exif.info = {}
+        save_options = {'format': image_format}
+        if transparency is not None:
+            save_options['transparency'] = transparency
+        img_without_exif.save(temp_path, **save_options)
+
 
 class PDFMetadataCleaner(MetadataCleaner):
     """Clean metadata from PDF files."""
@@ -167,59 +386,220 @@ class PDFMetadataCleaner(MetadataCleaner):
             return False, f"Error cleaning metadata: {str(e)}", file_path
 
 
-class DocxMetadataCleaner(MetadataCleaner):
-    """Clean metadata from DOCX files."""
+# Zip record signatures and fixed-size layouts (little-endian)
+ZIP_LOCAL_HEADER = struct.Struct('<4sHHHHHIIIHH')
+ZIP_CENTRAL_HEADER = struct.Struct('<4sHHHHHHIIIHHHHHII')
+ZIP_END_RECORD = struct.Struct('<4sHHHHIIH')
+ZIP_LOCAL_SIGNATURE = b'PK\x03\x04'
+ZIP_CENTRAL_SIGNATURE = b'PK\x01\x02'
+ZIP_END_SIGNATURE = b'PK\x05\x06'
+ZIP_DESCRIPTOR_SIGNATURE = b'PK\x07\x08'
+
+# Zip general purpose flags
+ZIP_FLAG_ENCRYPTED = 0x01
+ZIP_FLAG_DATA_DESCRIPTOR = 0x08
+ZIP_FLAG_UTF8 = 0x800
+
+# Document property parts, replaced with empty but valid property sets
+OOXML_PROPERTY_PARTS = {
+    'docProps/core.xml': (
+        b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\r\n'
+        b'<cp:coreProperties xmlns:cp="http://schemas.openxmlformats.org/package/2006/metadata/core-properties" '
+        b'xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns:dcterms="http://purl.org/dc/terms/" '
+        b'xmlns:dcmitype="http://purl.org/dc/dcmitype/" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"/>'
+    ),
+    'docProps/app.xml': (
+        b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\r\n'
+        b'<Properties xmlns="http://schemas.openxmlformats.org/officeDocument/2006/extended-properties" '
+        b'xmlns:vt="http://schemas.openxmlformats.org/officeDocument/2006/docPropsVTypes"/>'
+    ),
+    'docProps/custom.xml': (
+        b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\r\n'
+        b'<Properties xmlns="http://schemas.openxmlformats.org/officeDocument/2006/custom-properties" '
+        b'xmlns:vt="http://schemas.openxmlformats.org/officeDocument/2006/docPropsVTypes"/>'
+    ),
+}
+
+# Who wrote comments and tracked changes: part name pattern -> (pattern, replacement)
+OOXML_AUTHOR_PARTS = [
+    (re.compile(r'word/(document|comments\w*|footnotes|endnotes|header\d*|footer\d*)\.xml$'), [
+        (re.compile(rb'(\sw:(?:author|initials))="[^"]*"'), rb'\1=""'),
+        (re.compile(rb'\sw:date="[^"]*"'), b''),
+    ]),
+    (re.compile(r'word/people\.xml$'), [
+        (re.compile(rb'(\sw15:(?:author|userId|providerId))="[^"]*"'), rb'\1=""'),
+    ]),
+    (re.compile(r'xl/(comments/)?comments?\d*\.xml$'), [
+        (re.compile(rb'<author>[^<]*</author>'), b'<author></author>'),
+    ]),
+    (re.compile(r'xl/persons/person\w*\.xml$'), [
+        (re.compile(rb'(\s(?:displayName|userId|providerId))="[^"]*"'), rb'\1=""'),
+    ]),
+    (re.compile(r'ppt/commentAuthors\.xml$'), [
+        (re.compile(rb'(\s(?:name|initials))="[^"]*"'), rb'\1=""'),
+    ]),
+]
+
+
+def _deflate(content):
+    """Compress a zip member with raw deflate."""
+    compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return compressor.compress(content) + compressor.flush()
+
+
+class OOXMLMetadataCleaner(MetadataCleaner):
+    """
+    Clean metadata from Office Open XML files (DOCX, XLSX, PPTX).
+
+    The zip container is rewritten member by member. Only the document
+    property parts (and, with anonymize_authors, the parts naming comment and
+    revision authors) are decompressed and replaced; every other member's
+    compressed bytes are copied across unchanged.
+    """
+
+    def __init__(self, anonymize_authors=True):
+        self.anonymize_authors = anonymize_authors
 
     def clean(self, file_path):
         """
-        Remove all metadata from a DOCX file.
+        Remove document properties and author names from an OOXML file.
 
         Args:
-            file_path (str): Path to the DOCX file
+            file_path (str): Path to the DOCX, XLSX or PPTX file
 
         Returns:
             tuple: (success, message, cleaned_file_path)
         """
+        temp_path = None
         try:
-            # Create a temporary file
-            temp_fd, temp_path = tempfile.mkstemp(suffix='.docx')
+            # Create a temporary file next to the original so it can be renamed over it
+            temp_fd, temp_path = tempfile.mkstemp(suffix=os.path.splitext(file_path)[1],
+                                                  dir=os.path.dirname(os.path.abspath(file_path)))
             os.close(temp_fd)
-            
-            # Open the document
-            doc = docx.Document(file_path)
-            
-            # Clear core properties
-            core_props = doc.core_properties
-            core_props.author = ""
-            core_props.category = ""
-            core_props.comments = ""
-            core_props.content_status = ""
-            core_props.created = None
-            core_props.identifier = ""
-            core_props.keywords = ""
-            core_props.language = ""
-            core_props.last_modified_by = ""
-            core_props.last_printed = None
-            core_props.modified = None
-            core_props.revision = 1
-            core_props.subject = ""
-            core_props.title = ""
-            core_props.version = ""
-            
-            # Save the cleaned document
-            doc.save(temp_path)
-            
+
+            with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data, \
+                    open(temp_path, 'wb') as out:
+                rewritten = self._rewrite_container(data, out)
+
             # Replace the original file with the cleaned one
-            shutil.move(temp_path, file_path)
-            
-            return True, "Successfully removed metadata from DOCX", file_path
+            os.replace(temp_path, file_path)
+
+            return True, f"Successfully removed metadata from {len(rewritten)} document parts", file_path
         except Exception as e:
-            logging.error(f"Error cleaning DOCX metadata: {str(e)}")
+            logging.error(f"Error cleaning Office document metadata: {str(e)}")
             # Clean up temp file if it exists
-            if 'temp_path' in locals() and os.path.exists(temp_path):
+            if temp_path and os.path.exists(temp_path):
                 os.remove(temp_path)
             return False, f"Error cleaning metadata: {str(e)}", file_path
 
+    def _replacement(self, name, read_content):
+        """Get the new content for a member, or None to copy it unchanged."""
+        if name in OOXML_PROPERTY_PARTS:
+            return OOXML_PROPERTY_PARTS[name]
+        if not self.anonymize_authors:
+            return None
+        for part_pattern, substitutions in OOXML_AUTHOR_PARTS:
+            if part_pattern.match(name):
+                content = original = read_content()
+                for pattern, replacement in substitutions:
+                    content = pattern.sub(replacement, content)
+                return content if content != original else None
+        return None
+
+    def _rewrite_container(self, data, out):
+        """
+        Copy a zip archive to out, replacing the members that carry metadata.
+
+        Args:
+            data (mmap.mmap): The whole archive, mapped read-only
+            out: Binary file object to write to
+
+        Returns:
+            list: Names of the members that were rewritten
+
+        Raises:
+            ValueError: If the archive is malformed, encrypted, split or ZIP64
+        """
+        end_offset = data.rfind(ZIP_END_SIGNATURE, max(0, len(data) - ZIP_END_RECORD.size - 0xFFFF))
+        if end_offset < 0:
+            raise ValueError("Not a zip archive")
+        (_, disk, directory_disk, disk_entries, total_entries,
+         directory_size, directory_offset, comment_length) = ZIP_END_RECORD.unpack_from(data, end_offset)
+        if disk or directory_disk or disk_entries != total_entries:
+            raise ValueError("Split zip archives are not supported")
+        if total_entries == 0xFFFF or directory_offset == 0xFFFFFFFF:
+            raise ValueError("ZIP64 archives are not supported")
+
+        rewritten = []
+        central_records = []
+        written = 0
+
+        with memoryview(data) as view:
+            position = directory_offset
+            for _ in range(total_entries):
+                header = list(ZIP_CENTRAL_HEADER.unpack_from(data, position))
+                if header[0] != ZIP_CENTRAL_SIGNATURE:
+                    raise ValueError("Corrupt zip central directory")
+                flags, method, compressed_size, name_length, extra_length, comment_len, local_offset = (
+                    header[3], header[4], header[8], header[10], header[11], header[12], header[16]
+                )
+                record_end = position + ZIP_CENTRAL_HEADER.size + name_length + extra_length + comment_len
+                name_bytes = bytes(data[position + ZIP_CENTRAL_HEADER.size:
+                                        position + ZIP_CENTRAL_HEADER.size + name_length])
+                name = name_bytes.decode('utf-8' if flags & ZIP_FLAG_UTF8 else 'cp437')
+
+                local = ZIP_LOCAL_HEADER.unpack_from(data, local_offset)
+                if local[0] != ZIP_LOCAL_SIGNATURE:
+                    raise ValueError(f"Corrupt zip entry {name}")
+                data_start = local_offset + ZIP_LOCAL_HEADER.size + local[9] + local[10]
+                data_end = data_start + compressed_size
+
+                def read_content():
+                    if flags & ZIP_FLAG_ENCRYPTED or method not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+                        raise ValueError(f"Cannot rewrite zip entry {name}")
+                    raw = data[data_start:data_end]
+                    return zlib.decompress(raw, -zlib.MAX_WBITS) if method == zipfile.ZIP_DEFLATED else raw
+
+                content = self._replacement(name, read_content)
+                header[16] = written
+                if content is None:
+                    # Copy the local header, compressed data and any data descriptor as they are
+                    copy_end = data_end
+                    if flags & ZIP_FLAG_DATA_DESCRIPTOR:
+                        copy_end += 16 if data[data_end:data_end + 4] == ZIP_DESCRIPTOR_SIGNATURE else 12
+                    out.write(view[local_offset:copy_end])
+                    written += copy_end - local_offset
+                else:
+                    compressed = _deflate(content)
+                    crc = zlib.crc32(content)
+                    flags &= ZIP_FLAG_UTF8
+                    header[2:10] = [20, flags, zipfile.ZIP_DEFLATED, header[5], header[6], crc,
+                                    len(compressed), len(content)]
+                    local_header = ZIP_LOCAL_HEADER.pack(ZIP_LOCAL_SIGNATURE, 20, flags, zipfile.ZIP_DEFLATED,
+                                                         header[5], header[6], crc, len(compressed), len(content),
+                                                         name_length, 0)
+                    out.write(local_header)
+                    out.write(name_bytes)
+                    out.write(compressed)
+                    written += len(local_header) + name_length + len(compressed)
+                    rewritten.append(name)
+
+                central_records.append((ZIP_CENTRAL_HEADER.pack(*header), position + ZIP_CENTRAL_HEADER.size, record_end))
+                position = record_end
+
+            new_directory_offset = written
+            for fixed, variable_start, variable_end in central_records:
+                # Name, extra field and comment are copied from the original record
+                out.write(fixed)
+                out.write(view[variable_start:variable_end])
+                written += len(fixed) + variable_end - variable_start
+
+            out.write(ZIP_END_RECORD.pack(ZIP_END_SIGNATURE, 0, 0, total_entries, total_entries,
+                                          written - new_directory_offset, new_directory_offset, comment_length))
+            out.write(view[end_offset + ZIP_END_RECORD.size:end_offset + ZIP_END_RECORD.size + comment_length])
+
+        return rewritten
+
 
 class AudioMetadataCleaner(MetadataCleaner):
     """Clean metadata from audio files."""
@@ -299,9 +679,9 @@ def get_cleaner_for_file(file_path):
     elif extension == '.pdf':
         return PDFMetadataCleaner()
     
-    # DOCX files
-    elif extension == '.docx':
-        return DocxMetadataCleaner()
+    # Office Open XML documents, spreadsheets and presentations
+    elif extension in ['.docx', '.docm', '.xlsx', '.xlsm', '.pptx', '.pptm']:
+        return OOXMLMetadataCleaner()
     
     # Audio files
     elif extension in ['.mp3', '.flac', '.m4a', '.wav', '.ogg']:
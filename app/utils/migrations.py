@@ -0,0 +1,268 @@
+"""
+Lightweight schema upgrades and data backfills.
+
+Base.metadata.create_all only creates missing tables, so columns and indexes
+added to existing models are applied here on startup. Filling new columns for
+existing rows can take a while on a large catalog, so that is a separate
+command: flask --app app backfill-metadata
+
+Stored files saved before uploads were sharded by content hash are moved
+into the sharded layout with: flask --app app migrate-uploads
+"""
+import os
+import time
+import shutil
+import uuid
+import logging
+
+import click
+from sqlalchemy import inspect, or_, text
+from sqlalchemy.exc import DBAPIError
+
+from app.models.metadata import File, Metadata, ExtractionJob
+from app.utils.database import Base, SessionLocal
+from app.utils.hashing import hash_file
+from app.utils.file_utils import get_content_path, resolve_stored_path
+from app.utils.dedup import remove_unreferenced_file
+
+
+def _apply_ddl(engine, statement, already_applied):
+    """
+    Run one schema change in its own transaction.
+
+    Several workers may start at once and race to apply the same change. The
+    loser's statement fails (e.g. "duplicate column"); if the database now
+    shows the change in place, that is not an error.
+
+    Args:
+        engine (Engine): Database engine
+        statement (callable): Called with a connection to apply the change
+        already_applied (callable): Re-inspects the database, True if the change exists
+
+    Returns:
+        bool: True if this call applied the change
+    """
+    try:
+        with engine.begin() as connection:
+            statement(connection)
+        return True
+    except DBAPIError:
+        if already_applied():
+            return False
+        raise
+
+
+def upgrade_schema(engine):
+    """
+    Add model columns and indexes that are missing from existing tables.
+
+    Args:
+        engine (Engine): Database engine
+
+    Returns:
+        list: Descriptions of the changes applied
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    changes = []
+
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+
+        existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            column_type = column.type.compile(dialect=engine.dialect)
+            sql = text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}')
+            if _apply_ddl(engine, lambda connection: connection.execute(sql),
+                          lambda: column.name in {c['name'] for c in inspect(engine).get_columns(table.name)}):
+                changes.append(f"added column {table.name}.{column.name}")
+
+        existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing_indexes:
+                continue
+            if _apply_ddl(engine, lambda connection: index.create(bind=connection),
+                          lambda: index.name in {i['name'] for i in inspect(engine).get_indexes(table.name)}):
+                changes.append(f"created index {index.name}")
+
+    for change in changes:
+        logging.info(f"Schema upgrade: {change}")
+    return changes
+
+
+def backfill_promoted_columns(db, batch_size=500):
+    """
+    Fill promoted columns for rows stored before they existed.
+
+    Metadata rows have their promoted fields recomputed from metadata_json, and
+    files missing any of their digests are hashed from disk in one read. Work is committed in
+    batches, so an interrupted run can simply be started again.
+
+    Args:
+        db (Session): Database session
+        batch_size (int, optional): Rows per transaction
+
+    Returns:
+        dict: Number of metadata rows and files updated
+    """
+    counts = {'metadata': 0, 'files': 0}
+
+    last_id = 0
+    while True:
+        rows = (db.query(Metadata).filter(Metadata.id > last_id)
+                .order_by(Metadata.id).limit(batch_size).all())
+        if not rows:
+            break
+        for metadata in rows:
+            metadata.promote_fields()
+        db.commit()
+        counts['metadata'] += len(rows)
+        last_id = rows[-1].id
+        db.expunge_all()
+
+    last_id = 0
+    while True:
+        files = (db.query(File).filter(or_(File.content_hash.is_(None), File.sha1_hash.is_(None)), File.id > last_id)
+                 .order_by(File.id).limit(batch_size).all())
+        if not files:
+            break
+        for file in files:
+            # The recorded path may predate the sharded layout
+            path = resolve_stored_path(file.file_path, file.content_hash)
+            if os.path.exists(path):
+                file.apply_hashes(hash_file(path))
+                counts['files'] += 1
+        db.commit()
+        last_id = files[-1].id
+        db.expunge_all()
+
+    return counts
+
+
+def _place_file(source_path, target_path):
+    """
+    Make a stored file available at target_path without removing the source.
+
+    A hard link is used when possible so nothing is copied; across
+    filesystems the file is copied to a temporary name and renamed into place.
+    """
+    os.makedirs(os.path.dirname(target_path), exist_ok=True)
+    try:
+        os.link(source_path, target_path)
+    except FileExistsError:
+        # Same contents already stored there, e.g. by a concurrent upload
+        pass
+    except OSError:
+        temp_path = os.path.join(os.path.dirname(target_path), f".migrate_{uuid.uuid4().hex}.tmp")
+        try:
+            shutil.copy2(source_path, temp_path)
+            os.replace(temp_path, target_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+
+def migrate_upload_layout(db, batch_size=500, pause=0.0):
+    """
+    Move stored files into the sharded upload layout.
+
+    Each file is linked (or copied) to its sharded path first, then every
+    record pointing at the old path is repointed and committed, and only then
+    is the old path removed. Readers always find the file at either the old
+    or the new path, so this can run while the application is serving
+    requests. Work is committed in batches; an interrupted run can simply be
+    started again and skips files that were already moved.
+
+    Args:
+        db (Session): Database session
+        batch_size (int, optional): Files per transaction
+        pause (float, optional): Seconds to sleep between batches to limit I/O load
+
+    Returns:
+        dict: Number of files moved, already in place and missing from disk
+    """
+    counts = {'moved': 0, 'in_place': 0, 'missing': 0}
+
+    last_id = 0
+    while True:
+        files = (db.query(File).filter(File.id > last_id)
+                 .order_by(File.id).limit(batch_size).all())
+        if not files:
+            break
+        last_id = files[-1].id
+
+        old_paths = set()
+        for file in files:
+            current_path = resolve_stored_path(file.file_path, file.content_hash)
+            if not os.path.exists(current_path):
+                counts['missing'] += 1
+                continue
+            if not file.content_hash:
+                file.apply_hashes(hash_file(current_path))
+
+            extension = os.path.splitext(file.file_path)[1].lstrip('.') or None
+            target_path = get_content_path(file.content_hash, extension)
+            if file.file_path == target_path:
+                counts['in_place'] += 1
+                continue
+
+            if current_path != target_path:
+                _place_file(current_path, target_path)
+                old_paths.add(current_path)
+
+            # Repoint every record sharing the old path, including later batches
+            for path in {file.file_path, current_path}:
+                db.query(File).filter(File.file_path == path).update(
+                    {File.file_path: target_path, File.filename: os.path.basename(target_path)}
+                )
+                db.query(ExtractionJob).filter(ExtractionJob.file_path == path).update(
+                    {ExtractionJob.file_path: target_path}
+                )
+            counts['moved'] += 1
+
+        db.commit()
+        db.expunge_all()
+
+        # The new paths are committed, so the old copies can go
+        for path in old_paths:
+            remove_unreferenced_file(db, path)
+
+        if pause:
+            time.sleep(pause)
+
+    return counts
+
+
+def register_commands(app):
+    """
+    Register database maintenance commands with the Flask CLI.
+
+    Args:
+        app (Flask): The application
+    """
+    @app.cli.command('backfill-metadata')
+    @click.option('--batch-size', default=500, show_default=True, help='Rows per transaction')
+    def backfill_metadata_command(batch_size):
+        """Populate promoted metadata columns and file hashes for existing rows."""
+        db = SessionLocal()
+        try:
+            counts = backfill_promoted_columns(db, batch_size)
+        finally:
+            db.close()
+        click.echo(f"Updated {counts['metadata']} metadata rows and hashed {counts['files']} files")
+
+    @app.cli.command('migrate-uploads')
+    @click.option('--batch-size', default=500, show_default=True, help='Files per transaction')
+    @click.option('--pause', default=0.0, show_default=True, help='Seconds to wait between batches')
+    def migrate_uploads_command(batch_size, pause):
+        """Move stored files into the sharded upload layout."""
+        db = SessionLocal()
+        try:
+            counts = migrate_upload_layout(db, batch_size, pause)
+        finally:
+            db.close()
+        click.echo(f"Moved {counts['moved']} files; {counts['in_place']} already in place, "
+                   f"{counts['missing']} missing from disk")
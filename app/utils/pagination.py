@@ -0,0 +1,293 @@
+"""
+Keyset pagination, filtering and field projection for file listings.
+
+Pages are ordered newest first on (uploaded_at, id), with files that have no
+upload time last. Instead of an offset, each page hands back an opaque cursor
+holding the last row's key, and the next page starts strictly after it. Every
+page is an index range scan of the same cost, however deep into the catalog it
+is.
+"""
+import base64
+import datetime
+import json
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import load_only
+
+from app.models.metadata import File
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# API field name -> File column, for fields= projection
+FILE_FIELDS = {
+    'id': File.id,
+    'filename': File.original_filename,
+    'file_size': File.file_size,
+    'mime_type': File.mime_type,
+    'file_extension': File.file_extension,
+    'uploaded_at': File.uploaded_at,
+    'sha256': File.content_hash,
+    'sha1': File.sha1_hash,
+    'md5': File.md5_hash,
+    'tlsh': File.fuzzy_hash
+}
+
+# Hex digest length -> indexed File column, for hash= lookups
+HASH_COLUMNS = {
+    64: File.content_hash,
+    40: File.sha1_hash,
+    32: File.md5_hash
+}
+
+# Fields returned when no projection is requested, matching the old listing
+DEFAULT_FIELDS = ['id', 'filename', 'file_size', 'mime_type', 'uploaded_at']
+
+
+def encode_cursor(file):
+    """
+    Build the cursor pointing just past a file.
+
+    Args:
+        file (File): Last file on the current page
+
+    Returns:
+        str: Opaque URL-safe cursor
+    """
+    uploaded_at = file.uploaded_at.isoformat() if file.uploaded_at else None
+    key = json.dumps([uploaded_at, file.id])
+    return base64.urlsafe_b64encode(key.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Args:
+        cursor (str): Opaque cursor
+
+    Returns:
+        tuple: (uploaded_at, id) of the last file on the previous page;
+            uploaded_at is None if that file has no upload time
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        uploaded_at, file_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if uploaded_at is not None:
+            uploaded_at = datetime.datetime.fromisoformat(uploaded_at)
+        return uploaded_at, int(file_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def _parse_int(args, name):
+    value = args.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"'{name}' must be an integer")
+
+
+def _parse_date(args, name):
+    value = args.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return datetime.datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"'{name}' must be an ISO 8601 date or datetime")
+
+
+def _parse_hash(args):
+    value = (args.get('hash') or '').strip().lower()
+    if not value:
+        return None
+    if len(value) not in HASH_COLUMNS or any(c not in '0123456789abcdef' for c in value):
+        raise ValueError("'hash' must be a SHA-256, SHA-1 or MD5 hex digest")
+    return value
+
+
+def parse_file_filters(args):
+    """
+    Read listing filters from request arguments.
+
+    Supported arguments: mime (exact type or prefix such as 'image/*'),
+    ext (comma-separated extensions), min_size and max_size (bytes),
+    uploaded_after and uploaded_before (ISO 8601), and hash (a SHA-256,
+    SHA-1 or MD5 hex digest).
+
+    Args:
+        args: Request arguments (e.g. request.args)
+
+    Returns:
+        dict: Filters with None for those not given
+
+    Raises:
+        ValueError: If a filter value is invalid
+    """
+    extensions = args.get('ext', '')
+    return {
+        'mime': args.get('mime') or None,
+        'ext': [e.strip().lower().lstrip('.') for e in extensions.split(',') if e.strip()] or None,
+        'min_size': _parse_int(args, 'min_size'),
+        'max_size': _parse_int(args, 'max_size'),
+        'uploaded_after': _parse_date(args, 'uploaded_after'),
+        'uploaded_before': _parse_date(args, 'uploaded_before'),
+        'hash': _parse_hash(args)
+    }
+
+
+def parse_page_size(args):
+    """
+    Read the page size from request arguments, clamped to MAX_PAGE_SIZE.
+
+    Args:
+        args: Request arguments (e.g. request.args)
+
+    Returns:
+        int: Number of files per page
+
+    Raises:
+        ValueError: If limit is not a positive integer
+    """
+    limit = _parse_int(args, 'limit')
+    if limit is None:
+        return DEFAULT_PAGE_SIZE
+    if limit < 1:
+        raise ValueError("'limit' must be a positive integer")
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def parse_fields(value):
+    """
+    Parse a fields= projection.
+
+    Args:
+        value (str): Comma-separated field names, or None for the defaults
+
+    Returns:
+        list: Field names to return
+
+    Raises:
+        ValueError: If an unknown field is requested
+    """
+    if not value:
+        return list(DEFAULT_FIELDS)
+
+    fields = [f.strip() for f in value.split(',') if f.strip()]
+    unknown = [f for f in fields if f not in FILE_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}. Use any of: {', '.join(FILE_FIELDS)}")
+    return fields
+
+
+def apply_file_filters(query, filters):
+    """
+    Restrict a File query with parsed filters.
+
+    Args:
+        query: SQLAlchemy query over File
+        filters (dict): Filters from parse_file_filters
+
+    Returns:
+        Query: Filtered query
+    """
+    mime = filters.get('mime')
+    if mime:
+        if mime.endswith('/*'):
+            prefix = mime[:-1].replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            query = query.filter(File.mime_type.like(prefix + '%', escape='\\'))
+        else:
+            query = query.filter(File.mime_type == mime)
+    if filters.get('ext'):
+        query = query.filter(File.file_extension.in_(filters['ext']))
+    if filters.get('min_size') is not None:
+        query = query.filter(File.file_size >= filters['min_size'])
+    if filters.get('max_size') is not None:
+        query = query.filter(File.file_size <= filters['max_size'])
+    if filters.get('uploaded_after'):
+        query = query.filter(File.uploaded_at >= filters['uploaded_after'])
+    if filters.get('uploaded_before'):
+        query = query.filter(File.uploaded_at < filters['uploaded_before'])
+    if filters.get('hash'):
+        query = query.filter(HASH_COLUMNS[len(filters['hash'])] == filters['hash'])
+    return query
+
+
+def paginate_files(db, filters=None, cursor=None, limit=DEFAULT_PAGE_SIZE, fields=None):
+    """
+    Fetch one page of files, newest first.
+
+    Args:
+        db (Session): Database session
+        filters (dict, optional): Filters from parse_file_filters
+        cursor (str, optional): Cursor from the previous page
+        limit (int, optional): Files per page
+        fields (list, optional): Field names to load; all columns if None
+
+    Returns:
+        tuple: (files, next_cursor) where next_cursor is None on the last page
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    query = apply_file_filters(db.query(File), filters or {})
+
+    if fields is not None:
+        # The key columns are always needed to build the next cursor
+        columns = {FILE_FIELDS[f] for f in fields} | {File.id, File.uploaded_at}
+        query = query.options(load_only(*columns))
+
+    if cursor:
+        last_uploaded_at, last_id = decode_cursor(cursor)
+        if last_uploaded_at is None:
+            # Already into the files without an upload time, which sort last
+            query = query.filter(File.uploaded_at.is_(None), File.id < last_id)
+        else:
+            query = query.filter(or_(
+                File.uploaded_at < last_uploaded_at,
+                and_(File.uploaded_at == last_uploaded_at, File.id < last_id),
+                File.uploaded_at.is_(None)
+            ))
+
+    # The keyset filter above needs NULLs last. SQLite and MySQL already sort
+    # them there in descending order, and MySQL rejects NULLS LAST, so it is
+    # only spelled out for PostgreSQL, which sorts them first.
+    uploaded_order = File.uploaded_at.desc()
+    if db.get_bind().dialect.name == 'postgresql':
+        uploaded_order = uploaded_order.nulls_last()
+
+    # Fetch one extra row to learn whether another page exists
+    files = query.order_by(uploaded_order, File.id.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(files) > limit:
+        files = files[:limit]
+        next_cursor = encode_cursor(files[-1])
+
+    return files, next_cursor
+
+
+def file_fields(file, fields):
+    """
+    Serialize the requested fields of a file.
+
+    Args:
+        file (File): File record
+        fields (list): Field names from parse_fields
+
+    Returns:
+        dict: Field name -> JSON-safe value
+    """
+    record = {}
+    for field in fields:
+        value = getattr(file, FILE_FIELDS[field].key)
+        if isinstance(value, datetime.datetime):
+            value = value.isoformat()
+        record[field] = value
+    return record
@@ -0,0 +1,194 @@
+"""
+Full-text search over extracted document text.
+
+On SQLite an external-content FTS5 table mirrors metadata.extracted_text and is
+kept in sync by triggers on insert, update and delete. On PostgreSQL a GIN
+expression index over to_tsvector(extracted_text) serves the same purpose and
+needs no triggers. Other databases fall back to a LIKE scan.
+"""
+import re
+import logging
+
+from sqlalchemy import inspect, text
+
+# Marks placed around matched terms in snippets
+HIGHLIGHT_START = '<mark>'
+HIGHLIGHT_END = '</mark>'
+SNIPPET_TOKENS = 16
+
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+
+POSTGRES_TEXT_CONFIG = 'english'
+
+_SQLITE_FTS_SETUP = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS metadata_fts USING fts5(
+        extracted_text, content='metadata', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS metadata_fts_insert AFTER INSERT ON metadata BEGIN
+        INSERT INTO metadata_fts(rowid, extracted_text) VALUES (new.id, new.extracted_text);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS metadata_fts_delete AFTER DELETE ON metadata BEGIN
+        INSERT INTO metadata_fts(metadata_fts, rowid, extracted_text) VALUES ('delete', old.id, old.extracted_text);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS metadata_fts_update AFTER UPDATE OF extracted_text ON metadata BEGIN
+        INSERT INTO metadata_fts(metadata_fts, rowid, extracted_text) VALUES ('delete', old.id, old.extracted_text);
+        INSERT INTO metadata_fts(rowid, extracted_text) VALUES (new.id, new.extracted_text);
+    END""",
+    # Index the rows stored before the table existed
+    "INSERT INTO metadata_fts(metadata_fts) VALUES ('rebuild')",
+]
+
+POSTGRES_FTS_INDEX = 'ix_metadata_extracted_text_fts'
+
+# Which search implementation the database supports: 'fts5', 'postgres' or 'like'
+_search_backend = 'like'
+
+
+def _search_index_exists(engine, dialect):
+    """Check whether the full-text index is already in place."""
+    try:
+        if dialect == 'sqlite':
+            return 'metadata_fts' in inspect(engine).get_table_names()
+        if dialect == 'postgresql':
+            with engine.connect() as connection:
+                return connection.execute(text("SELECT to_regclass(:name)"), {'name': POSTGRES_FTS_INDEX}).scalar() is not None
+    except Exception:
+        pass
+    return False
+
+
+def ensure_search_index(engine):
+    """
+    Create the full-text index for the database if it does not exist yet.
+
+    Args:
+        engine (Engine): Database engine
+    """
+    global _search_backend
+    dialect = engine.dialect.name
+
+    try:
+        if dialect == 'sqlite':
+            if not _search_index_exists(engine, dialect):
+                # IF NOT EXISTS throughout: other workers may be starting up
+                # and creating the same table at the same time
+                with engine.begin() as connection:
+                    for statement in _SQLITE_FTS_SETUP:
+                        connection.execute(text(statement))
+                logging.info("Created full-text index metadata_fts")
+            _search_backend = 'fts5'
+        elif dialect == 'postgresql':
+            with engine.begin() as connection:
+                connection.execute(text(
+                    f"CREATE INDEX IF NOT EXISTS {POSTGRES_FTS_INDEX} ON metadata "
+                    f"USING GIN (to_tsvector('{POSTGRES_TEXT_CONFIG}', coalesce(extracted_text, '')))"
+                ))
+            _search_backend = 'postgres'
+        else:
+            logging.warning(f"No full-text index support for {dialect}; search will scan extracted text")
+    except Exception as e:
+        # A worker that lost a creation race still gets the index
+        if _search_index_exists(engine, dialect):
+            logging.info(f"Full-text index was created concurrently: {str(e)}")
+            _search_backend = 'fts5' if dialect == 'sqlite' else 'postgres'
+            return
+        # e.g. SQLite built without FTS5
+        logging.error(f"Could not create full-text index, search will scan extracted text: {str(e)}")
+        _search_backend = 'like'
+
+
+def _fts5_query(query):
+    """
+    Turn free text into a safe FTS5 query.
+
+    Each term is quoted so FTS5 operators in user input are matched literally;
+    a trailing '*' on a term is kept as a prefix search. Terms are ANDed.
+    """
+    terms = []
+    for term in query.split():
+        prefix = term.endswith('*')
+        term = term.rstrip('*').replace('"', '""')
+        if term:
+            terms.append(f'"{term}"' + ('*' if prefix else ''))
+    return ' '.join(terms)
+
+
+def _like_snippet(extracted_text, query):
+    """Build a highlighted snippet around the first matching term."""
+    extracted_text = extracted_text or ''
+    for term in query.split():
+        term = term.rstrip('*')
+        match = re.search(re.escape(term), extracted_text, re.IGNORECASE) if term else None
+        if match:
+            start = max(match.start() - 60, 0)
+            end = min(match.end() + 60, len(extracted_text))
+            return ('...' if start else '') + extracted_text[start:match.start()] + HIGHLIGHT_START + \
+                match.group(0) + HIGHLIGHT_END + extracted_text[match.end():end] + ('...' if end < len(extracted_text) else '')
+    return extracted_text[:120]
+
+
+def search_extracted_text(db, query, limit=DEFAULT_SEARCH_LIMIT, offset=0):
+    """
+    Search extracted text, best matches first.
+
+    Args:
+        db (Session): Database session
+        query (str): Search terms; all must match, 'term*' matches a prefix
+        limit (int, optional): Maximum number of results
+        offset (int, optional): Number of results to skip
+
+    Returns:
+        list: Result dicts with file_id, filename, mime_type, snippet and rank
+    """
+    params = {'limit': limit, 'offset': offset}
+
+    if _search_backend == 'fts5':
+        params['q'] = _fts5_query(query)
+        if not params['q']:
+            return []
+        # bm25() is lower for better matches
+        sql = text(f"""
+            SELECT m.file_id, f.original_filename, f.mime_type,
+                   snippet(metadata_fts, 0, :hl_start, :hl_end, '...', {SNIPPET_TOKENS}) AS snippet,
+                   bm25(metadata_fts) AS rank
+            FROM metadata_fts
+            JOIN metadata m ON m.id = metadata_fts.rowid
+            JOIN files f ON f.id = m.file_id
+            WHERE metadata_fts MATCH :q
+            ORDER BY rank
+            LIMIT :limit OFFSET :offset
+        """)
+        params.update(hl_start=HIGHLIGHT_START, hl_end=HIGHLIGHT_END)
+        rows = db.execute(sql, params).all()
+        return [{'file_id': r[0], 'filename': r[1], 'mime_type': r[2], 'snippet': r[3], 'rank': -r[4]} for r in rows]
+
+    if _search_backend == 'postgres':
+        params.update(q=query, hl_options=f'StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_END}, MaxWords=35, MinWords=15')
+        sql = text(f"""
+            SELECT m.file_id, f.original_filename, f.mime_type,
+                   ts_headline('{POSTGRES_TEXT_CONFIG}', m.extracted_text, query, :hl_options) AS snippet,
+                   ts_rank(to_tsvector('{POSTGRES_TEXT_CONFIG}', coalesce(m.extracted_text, '')), query) AS rank
+            FROM metadata m
+            JOIN files f ON f.id = m.file_id,
+                 websearch_to_tsquery('{POSTGRES_TEXT_CONFIG}', :q) AS query
+            WHERE to_tsvector('{POSTGRES_TEXT_CONFIG}', coalesce(m.extracted_text, '')) @@ query
+            ORDER BY rank DESC
+            LIMIT :limit OFFSET :offset
+        """)
+        rows = db.execute(sql, params).all()
+        return [{'file_id': r[0], 'filename': r[1], 'mime_type': r[2], 'snippet': r[3], 'rank': float(r[4])} for r in rows]
+
+    # No full-text index: every term must appear somewhere in the text
+    from app.models.metadata import File, Metadata
+
+    terms = [term.rstrip('*') for term in query.split() if term.rstrip('*')]
+    if not terms:
+        return []
+    rows_query = db.query(Metadata.file_id, File.original_filename, File.mime_type, Metadata.extracted_text) \
+        .join(File, File.id == Metadata.file_id)
+    for term in terms:
+        rows_query = rows_query.filter(Metadata.extracted_text.ilike(f'%{term}%'))
+    rows = rows_query.order_by(Metadata.id.desc()).limit(limit).offset(offset).all()
+    return [{'file_id': r[0], 'filename': r[1], 'mime_type': r[2], 'snippet': _like_snippet(r[3], query), 'rank': None}
+            for r in rows]
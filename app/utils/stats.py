@@ -0,0 +1,238 @@
+"""
+Precomputed dashboard statistics.
+
+Counters in the dashboard_stats table are adjusted inside the same flush that
+adds or deletes File and Metadata rows, so every code path that stores or
+removes files (uploads, API extraction, jobs, batches, deletion) keeps them
+current without extra bookkeeping, and the dashboard reads them in constant
+time instead of scanning the catalog.
+"""
+from collections import Counter
+
+from sqlalchemy import event, func, select, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history
+
+from app.models.metadata import File, Metadata, DashboardStat
+from app.utils.steganalysis import SUSPICIOUS
+
+# File categories shown on the dashboard
+FILE_CATEGORIES = ['image', 'document', 'spreadsheet', 'other']
+
+# Counter names
+FILES = 'files'
+TOTAL_BYTES = 'total_bytes'
+METADATA_RECORDS = 'metadata_records'
+SUSPICIOUS_FILES = 'suspicious_files'
+STAT_NAMES = [FILES, TOTAL_BYTES, METADATA_RECORDS, SUSPICIOUS_FILES] + [f'files_{c}' for c in FILE_CATEGORIES]
+
+
+def file_category(mime_type):
+    """
+    Classify a MIME type into a dashboard category.
+
+    Args:
+        mime_type (str): MIME type
+
+    Returns:
+        str: One of FILE_CATEGORIES
+    """
+    mime_type = mime_type or ''
+    if 'image' in mime_type:
+        return 'image'
+    if 'spreadsheet' in mime_type or 'excel' in mime_type:
+        return 'spreadsheet'
+    if ('pdf' in mime_type or 'msword' in mime_type or 'document' in mime_type
+            or mime_type.startswith('text/')):
+        return 'document'
+    return 'other'
+
+
+def is_suspicious(metadata_json):
+    """
+    Check whether stored metadata carries a suspicious steganography verdict.
+
+    Args:
+        metadata_json (dict): Stored metadata dictionary
+
+    Returns:
+        bool: True if steganalysis flagged the file
+    """
+    if not isinstance(metadata_json, dict):
+        return False
+    summary = metadata_json.get('steganography_summary') or {}
+    return summary.get('verdict') == SUSPICIOUS
+
+
+def _file_deltas(file, sign):
+    return Counter({
+        FILES: sign,
+        f'files_{file_category(file.mime_type)}': sign,
+        TOTAL_BYTES: sign * (file.file_size or 0)
+    })
+
+
+def _metadata_deltas(metadata, sign):
+    deltas = Counter({METADATA_RECORDS: sign})
+    if is_suspicious(metadata.metadata_json):
+        deltas[SUSPICIOUS_FILES] += sign
+    return deltas
+
+
+def _changed_value(session, file, attribute):
+    """
+    Get the previous and pending values of a File column.
+
+    Both are None when the column is unchanged. If the old value was never
+    loaded it is read from the database.
+    """
+    history = get_history(file, attribute)
+    if not history.added:
+        return None, None
+    if history.deleted:
+        return history.deleted[0], history.added[0]
+    column = File.__table__.c[attribute]
+    previous = session.connection().execute(
+        select(column).where(File.__table__.c.id == file.id)
+    ).scalar()
+    return previous, history.added[0]
+
+
+@event.listens_for(Session, 'before_flush')
+def _track_dashboard_stats(session, flush_context, instances):
+    """Fold the pending File and Metadata changes into the counters."""
+    deltas = Counter()
+
+    for obj in session.new:
+        if isinstance(obj, File):
+            deltas.update(_file_deltas(obj, 1))
+        elif isinstance(obj, Metadata):
+            deltas.update(_metadata_deltas(obj, 1))
+
+    for obj in session.deleted:
+        if isinstance(obj, File):
+            deltas.update(_file_deltas(obj, -1))
+        elif isinstance(obj, Metadata):
+            deltas.update(_metadata_deltas(obj, -1))
+
+    for obj in session.dirty:
+        # Cleaning stores new contents, which changes the size
+        if isinstance(obj, File):
+            old_size, new_size = _changed_value(session, obj, 'file_size')
+            if old_size != new_size:
+                deltas[TOTAL_BYTES] += (new_size or 0) - (old_size or 0)
+            old_mime, new_mime = _changed_value(session, obj, 'mime_type')
+            if file_category(old_mime) != file_category(new_mime):
+                deltas[f'files_{file_category(old_mime)}'] -= 1
+                deltas[f'files_{file_category(new_mime)}'] += 1
+
+        # Re-extraction (e.g. after cleaning) can change a stored verdict
+        elif isinstance(obj, Metadata):
+            history = get_history(obj, 'metadata_json')
+            if history.deleted and history.added:
+                deltas[SUSPICIOUS_FILES] += int(is_suspicious(history.added[0])) - int(is_suspicious(history.deleted[0]))
+
+    # Only counters that actually change are written, in a fixed order, so
+    # flushes that do not affect them never wait on the counter rows
+    changed = sorted((name, delta) for name, delta in deltas.items() if delta)
+    if not changed:
+        return
+    connection = session.connection()
+    for name, delta in changed:
+        connection.execute(
+            update(DashboardStat.__table__)
+            .where(DashboardStat.__table__.c.name == name)
+            .values(value=DashboardStat.__table__.c.value + delta)
+        )
+
+
+def _catalog_totals(db):
+    """Count every counter's value from the catalog."""
+    totals = Counter({name: 0 for name in STAT_NAMES})
+
+    for mime_type, count, size in db.query(File.mime_type, func.count(File.id), func.sum(File.file_size)).group_by(File.mime_type):
+        totals[FILES] += count
+        totals[f'files_{file_category(mime_type)}'] += count
+        totals[TOTAL_BYTES] += size or 0
+
+    for (metadata_json,) in db.query(Metadata.metadata_json).yield_per(500):
+        totals[METADATA_RECORDS] += 1
+        totals[SUSPICIOUS_FILES] += int(is_suspicious(metadata_json))
+
+    return totals
+
+
+def _write_counters(db, totals, replace):
+    """
+    Insert counter rows, tolerating rows another worker inserted concurrently.
+
+    Args:
+        db (Session): Database session
+        totals (dict): Counter name -> value
+        replace (bool): Overwrite existing rows instead of keeping them
+    """
+    table = DashboardStat.__table__
+    rows = [{'name': name, 'value': totals[name]} for name in STAT_NAMES]
+    dialect = db.get_bind().dialect.name
+
+    if dialect == 'mysql':
+        statement = mysql_insert(table)
+        if replace:
+            statement = statement.on_duplicate_key_update(value=statement.inserted.value)
+        else:
+            statement = statement.prefix_with('IGNORE')
+    else:
+        statement = (postgresql_insert if dialect == 'postgresql' else sqlite_insert)(table)
+        if replace:
+            statement = statement.on_conflict_do_update(index_elements=[table.c.name],
+                                                        set_={'value': statement.excluded.value})
+        else:
+            statement = statement.on_conflict_do_nothing(index_elements=[table.c.name])
+
+    db.execute(statement, rows)
+
+
+def rebuild_dashboard_stats(db):
+    """
+    Recompute every counter from the catalog.
+
+    Args:
+        db (Session): Database session
+    """
+    totals = _catalog_totals(db)
+    db.query(DashboardStat).filter(DashboardStat.name.notin_(STAT_NAMES)).delete(synchronize_session=False)
+    _write_counters(db, totals, replace=True)
+    db.commit()
+
+
+def ensure_dashboard_stats(db):
+    """
+    Build the counters if any are missing, e.g. on first start after upgrading.
+
+    Workers starting together may all find them missing; counters another
+    worker has already stored are left as they are.
+
+    Args:
+        db (Session): Database session
+    """
+    if db.query(func.count(DashboardStat.name)).scalar() < len(STAT_NAMES):
+        _write_counters(db, _catalog_totals(db), replace=False)
+        db.commit()
+
+
+def get_dashboard_stats(db):
+    """
+    Read all counters.
+
+    Args:
+        db (Session): Database session
+
+    Returns:
+        dict: Counter name -> value (missing counters read as 0)
+    """
+    stats = {name: 0 for name in STAT_NAMES}
+    stats.update(dict(db.query(DashboardStat.name, DashboardStat.value).all()))
+    return stats
@@ -0,0 +1,844 @@
+"""
+Steganography analyzers for decoded images.
+
+Each analyzer is a plugin registered in ANALYZERS. It declares a cost class
+and the input it needs from the shared DecodedImage (color pixels, grayscale
+pixels or block DCT coefficients), and returns a numeric suspicion score with
+a verdict. run_analyzers schedules the registered analyzers on a shared thread
+pool (NumPy and OpenCV release the GIL) within a per-image time budget.
+"""
+import os
+import time
+import logging
+import threading
+from concurrent import futures
+
+from PIL import Image, UnidentifiedImageError
+
+from app.config import app_config
+
+try:
+    import cv2
+    import numpy as np
+    from scipy.stats import chi2
+    STEGANALYSIS_AVAILABLE = True
+except ImportError:
+    STEGANALYSIS_AVAILABLE = False
+
+# Input an analyzer reads from the decoded image
+COLOR_INPUT = 'color'
+GRAY_INPUT = 'gray'
+COEFFICIENT_INPUT = 'coefficients'
+
+# Cost classes; cheaper analyzers are scheduled first so they finish within
+# the time budget even when an expensive one does not
+CHEAP_COST = 'cheap'
+MODERATE_COST = 'moderate'
+EXPENSIVE_COST = 'expensive'
+COST_ORDER = {CHEAP_COST: 0, MODERATE_COST: 1, EXPENSIVE_COST: 2}
+
+# Verdicts
+SUSPICIOUS = 'suspicious'
+CLEAN = 'clean'
+INCONCLUSIVE = 'inconclusive'
+ERROR = 'error'
+TIMEOUT = 'timeout'
+
+# Rows per strip for the tiled analyses. Must be a multiple of 8 so strips
+# line up with DCT blocks and RS groups.
+STRIP_ROWS = 256
+
+# OpenCV decodes the whole frame at once, so the largest image analyzed is
+# set by memory rather than file size. Unless STEGANALYSIS_MAX_MEGAPIXELS is
+# configured, the decoded frame may take DECODE_MEMORY_SHARE of the worker
+# memory limit at DECODE_BYTES_PER_PIXEL (color and grayscale buffers plus
+# decoder scratch); 2048 MB allows about 134 megapixels.
+DECODE_BYTES_PER_PIXEL = 8
+DECODE_MEMORY_SHARE = 0.5
+
+# Largest image analyzed when the worker memory limit is disabled
+DEFAULT_MAX_DECODE_PIXELS = 100_000_000
+
+# Quantized DCT coefficients are histogrammed over [-DCT_RANGE, DCT_RANGE)
+DCT_RANGE = 1024
+
+# RS analysis reads the image as fully embedded when R_M - S_M has shrunk to
+# this fraction of R_-M - S_-M, and a quadratic root this close to 0.5 as
+# having no finite solution
+RS_SATURATION_RATIO = 0.1
+RS_ROOT_TOLERANCE = 0.01
+
+# The overall verdict is suspicious when the weighted mean of the calibrated
+# analyzer scores (embedding rate estimates and probabilities) exceeds this
+VERDICT_THRESHOLD = 0.05
+
+# Seconds allowed for all analyses of one image
+DEFAULT_TIME_BUDGET = 20.0
+
+MAX_WORKERS = min(4, os.cpu_count() or 1)
+
+
+def max_decode_pixels():
+    """
+    Get the largest image, in pixels, decoded for analysis.
+
+    Returns:
+        int: STEGANALYSIS_MAX_MEGAPIXELS if set, otherwise derived from
+            EXTRACTION_MEMORY_LIMIT_MB
+    """
+    if app_config.STEGANALYSIS_MAX_MEGAPIXELS > 0:
+        return app_config.STEGANALYSIS_MAX_MEGAPIXELS * 1_000_000
+    if app_config.EXTRACTION_MEMORY_LIMIT_MB > 0:
+        budget = app_config.EXTRACTION_MEMORY_LIMIT_MB * 1024 * 1024 * DECODE_MEMORY_SHARE
+        return int(budget // DECODE_BYTES_PER_PIXEL)
+    return DEFAULT_MAX_DECODE_PIXELS
+
+
+class AnalysisCancelled(Exception):
+    """Raised inside an analyzer when its image's analysis has been cancelled."""
+
+
+class DecodedImage:
+    """
+    Pixel buffers for an image, decoded once and shared by every
+    steganography analysis.
+
+    The color array is decoded eagerly; the grayscale view is derived from it
+    on first access so analyses that only need one channel never pay for a
+    second decode. For JPEG files the luminance quantization table is kept so
+    coefficient-domain analyses can re-quantize 8x8 blocks.
+
+    Analyses read the pixels through strips(), which stops them with
+    AnalysisCancelled once cancel() has been called, so an analysis that
+    overruns its time budget gives its worker thread back after at most one
+    more strip.
+    """
+
+    def __init__(self, color, quantization=None):
+        self.color = color
+        self.quantization = quantization
+        self._gray = None
+        self._cancelled = threading.Event()
+
+    @classmethod
+    def from_file(cls, file_path, quantization=None, size=None, max_pixels=None):
+        """
+        Decode an image file into a shared pixel context.
+
+        The dimensions are checked before decoding, since the whole frame is
+        decoded into memory at once.
+
+        Args:
+            file_path (str): Path to the image file
+            quantization (list, optional): 64 luminance quantization values in
+                row-major order, as reported by Pillow for JPEG files.
+                Defaults to None.
+            size (tuple, optional): Width and height already read from the
+                image header. Read with Pillow if not given.
+            max_pixels (int, optional): Largest image to decode. Defaults to
+                max_decode_pixels().
+
+        Returns:
+            DecodedImage: The decoded image, or None if it could not be read
+
+        Raises:
+            ValueError: If the image is larger than max_pixels
+        """
+        if size is None:
+            try:
+                with Image.open(file_path) as img:
+                    size = img.size
+            except (OSError, UnidentifiedImageError):
+                return None
+        width, height = size
+        if max_pixels is None:
+            max_pixels = max_decode_pixels()
+        if width * height > max_pixels:
+            raise ValueError(f"Image is {width}x{height} pixels, above the "
+                             f"{max_pixels} pixel limit for steganography analysis")
+
+        color = cv2.imread(file_path, cv2.IMREAD_COLOR)
+        if color is None:
+            return None
+        return cls(color, quantization)
+
+    @property
+    def gray(self):
+        """Grayscale view of the image, computed once from the color array."""
+        if self._gray is None:
+            self._gray = cv2.cvtColor(self.color, cv2.COLOR_BGR2GRAY)
+        return self._gray
+
+    def cancel(self):
+        """Stop analyses still reading this image at their next strip."""
+        self._cancelled.set()
+
+    @property
+    def shape(self):
+        """Height and width of the image in pixels."""
+        return self.color.shape[:2]
+
+    def strips(self, rows, overlap=0, color=False):
+        """
+        Yield horizontal strips of the image as views into the shared buffer.
+
+        Analyses that walk the image strip by strip keep their temporaries
+        proportional to the strip size instead of the full frame.
+
+        Args:
+            rows (int): Number of rows each strip advances by
+            overlap (int, optional): Extra rows shared with the next strip, for
+                statistics over vertically adjacent pixels. Defaults to 0.
+            color (bool, optional): Yield color strips instead of grayscale.
+                Defaults to False.
+
+        Yields:
+            numpy.ndarray: A view of at most rows + overlap image rows
+
+        Raises:
+            AnalysisCancelled: If the analysis was cancelled
+        """
+        pixels = self.color if color else self.gray
+        height = pixels.shape[0]
+        for top in range(0, height, rows):
+            if self._cancelled.is_set():
+                raise AnalysisCancelled()
+            yield pixels[top:min(top + rows + overlap, height)]
+
+    def coefficient_strips(self, rows):
+        """
+        Yield the 8x8 block DCT coefficients of the image strip by strip.
+
+        Args:
+            rows (int): Strip height, a multiple of 8
+
+        Yields:
+            numpy.ndarray: Integer coefficients shaped (blocks, 8, 8)
+        """
+        for strip in self.strips(rows):
+            coeffs = block_dct_coefficients(strip, self.quantization)
+            if coeffs is not None:
+                yield coeffs
+
+
+def block_dct_coefficients(pixels, quantization=None):
+    """
+    Compute the 8x8 block DCT of a grayscale strip in one batched transform.
+
+    Args:
+        pixels (numpy.ndarray): Grayscale pixels; partial edge blocks are dropped
+        quantization (list, optional): 64 luminance quantization values in
+            row-major order. Defaults to None for unquantized coefficients.
+
+    Returns:
+        numpy.ndarray: Integer coefficients shaped (blocks, 8, 8), or None if
+        the strip holds no complete block
+    """
+    rows, cols = pixels.shape
+    rows -= rows % 8
+    cols -= cols % 8
+    if rows == 0 or cols == 0:
+        return None
+
+    # Split into (blocks, 8, 8) and level-shift as a JPEG encoder does
+    blocks = pixels[:rows, :cols].reshape(rows // 8, 8, cols // 8, 8).swapaxes(1, 2)
+    blocks = blocks.reshape(-1, 8, 8).astype(np.float32) - 128.0
+
+    # Orthonormal DCT-II basis, applied to rows and columns of every block
+    k = np.arange(8)
+    basis = np.cos(np.pi * (2 * k[None, :] + 1) * k[:, None] / 16) * np.sqrt(2 / 8)
+    basis[0] /= np.sqrt(2)
+    basis = basis.astype(np.float32)
+    coeffs = basis @ blocks @ basis.T
+
+    if quantization is not None:
+        coeffs /= np.asarray(quantization, dtype=np.float32).reshape(8, 8)
+
+    return np.rint(coeffs).astype(np.int32)
+
+
+class SteganalysisAnalyzer:
+    """
+    Base class for steganography analyzer plugins.
+
+    Subclasses set a unique name, their cost class, the input they require,
+    the score above which the image is reported as suspicious and the weight
+    of their score in the overall verdict, and implement analyze(). Only
+    calibrated scores (embedding rate estimates or probabilities) should
+    carry weight; heuristics are reported with a weight of 0.
+    """
+
+    name = None
+    cost = CHEAP_COST
+    requires = GRAY_INPUT
+    threshold = 0.5
+    weight = 1.0
+
+    def analyze(self, image):
+        """
+        Analyze a decoded image.
+
+        Args:
+            image (DecodedImage): Shared pixel context
+
+        Returns:
+            tuple: (score, details) where score is a suspicion score in [0, 1]
+            and details is a dict of the underlying statistics, or None when
+            the image holds too little data for the test
+        """
+        raise NotImplementedError("Subclasses must implement analyze method")
+
+    def run(self, image):
+        """
+        Run the analysis and wrap its outcome in a result dictionary.
+
+        Args:
+            image (DecodedImage): Shared pixel context
+
+        Returns:
+            dict: Result with score, verdict, suspicious flag and details
+        """
+        start_time = time.time()
+        try:
+            outcome = self.analyze(image)
+            if outcome is None:
+                result = self._result(None, INCONCLUSIVE, details={"reason": "insufficient data"})
+            else:
+                score, details = outcome
+                verdict = SUSPICIOUS if score > self.threshold else CLEAN
+                result = self._result(score, verdict, details=details)
+        except AnalysisCancelled:
+            result = self._result(None, TIMEOUT)
+        except Exception as e:
+            logging.error(f"Error in {self.name}: {str(e)}")
+            result = self._result(None, ERROR, error=str(e))
+
+        result["duration_ms"] = int((time.time() - start_time) * 1000)
+        return result
+
+    def _result(self, score, verdict, details=None, error=None):
+        result = {
+            "score": round(float(score), 4) if score is not None else None,
+            "verdict": verdict,
+            "suspicious": verdict == SUSPICIOUS,
+            "threshold": self.threshold,
+            "weight": self.weight,
+            "cost": self.cost,
+        }
+        if details:
+            result["details"] = details
+        if error:
+            result["error"] = error
+        return result
+
+
+# Registered analyzer classes, keyed by name
+ANALYZERS = {}
+
+
+def register_analyzer(analyzer_class):
+    """
+    Register an analyzer plugin. Usable as a class decorator.
+
+    Args:
+        analyzer_class (type): SteganalysisAnalyzer subclass with a unique name
+
+    Returns:
+        type: The analyzer class, unchanged
+    """
+    if not analyzer_class.name:
+        raise ValueError("Analyzer plugins must define a name")
+    if analyzer_class.cost not in COST_ORDER:
+        raise ValueError(f"Unknown cost class for {analyzer_class.name}: {analyzer_class.cost}")
+    ANALYZERS[analyzer_class.name] = analyzer_class
+    return analyzer_class
+
+
+@register_analyzer
+class LSBAnalyzer(SteganalysisAnalyzer):
+    """
+    Share of set least significant bits in the blue channel. Random message
+    bits push it towards one half.
+
+    Natural photos sit close to one half as well, so the score is reported
+    but carries no weight in the overall verdict.
+    """
+
+    name = 'lsb_analysis'
+    cost = CHEAP_COST
+    requires = COLOR_INPUT
+    threshold = 0.9  # Ratio within 0.05 of one half
+    weight = 0.0
+
+    def analyze(self, image):
+        rows, cols = image.shape
+        ones = 0
+        for strip in image.strips(STRIP_ROWS, color=True):
+            ones += np.count_nonzero(strip[:, :, 0] & 1)
+        ratio = ones / (rows * cols)
+
+        return 1.0 - 2.0 * abs(ratio - 0.5), {"lsb_ratio": round(ratio, 6)}
+
+
+@register_analyzer
+class ChiSquareAnalyzer(SteganalysisAnalyzer):
+    """
+    Westfeld and Pfitzmann's pairs-of-values chi-square test on the
+    grayscale histogram. LSB replacement equalizes the counts of each value
+    pair (2k, 2k+1); the score is the probability of embedding.
+
+    The test only responds once most pixels carry message bits, so its
+    weight in the overall verdict is halved.
+    """
+
+    name = 'chi_square_analysis'
+    cost = CHEAP_COST
+    requires = GRAY_INPUT
+    threshold = 0.95
+    weight = 0.5
+
+    def analyze(self, image):
+        hist = cv2.calcHist([image.gray], [0], None, [256], [0, 256]).ravel()
+        pair_hist = hist.reshape(-1, 2)
+
+        expected = pair_hist.sum(axis=1) / 2.0
+        observed = pair_hist[:, 0]
+        categories = expected > 4  # Chi-square needs reasonably populated cells
+
+        if np.count_nonzero(categories) < 2:
+            return None
+
+        statistic = float(np.sum((observed[categories] - expected[categories]) ** 2 / expected[categories]))
+        probability = float(chi2.sf(statistic, np.count_nonzero(categories) - 1))
+
+        return probability, {
+            "chi_square": round(statistic, 4),
+            "degrees_of_freedom": int(np.count_nonzero(categories) - 1),
+        }
+
+
+@register_analyzer
+class DCTAnalyzer(SteganalysisAnalyzer):
+    """
+    Pairs-of-values chi-square test over the 8x8 block DCT coefficients.
+
+    JPEG steganography (JSteg-style LSB replacement on coefficients) equalizes
+    the histogram frequencies of each pair of values (2k, 2k+1). For JPEG files
+    the blocks are re-quantized with the file's own luminance table, which
+    recovers the stored coefficients closely; other formats use the rounded
+    unquantized coefficients. The score is the embedding probability.
+    """
+
+    name = 'dct_analysis'
+    cost = EXPENSIVE_COST
+    requires = COEFFICIENT_INPUT
+    threshold = 0.95
+
+    def analyze(self, image):
+        offset = DCT_RANGE
+        hist = np.zeros(2 * offset, dtype=np.int64)
+
+        # The strip height is a multiple of 8, so blocks never straddle strips
+        for coeffs in image.coefficient_strips(STRIP_ROWS):
+            # Drop the DC term of every block and histogram the AC terms
+            ac = coeffs.reshape(-1, 64)[:, 1:]
+            ac = np.clip(ac, -offset, offset - 1) + offset
+            hist += np.bincount(ac.ravel(), minlength=2 * offset)
+
+        # JSteg never embeds in coefficients equal to 0 or 1
+        values = np.arange(-offset, offset)
+        usable = (values != 0) & (values != 1)
+        pair_hist = np.where(usable, hist, 0).reshape(-1, 2)
+
+        expected = pair_hist.sum(axis=1) / 2.0
+        observed = pair_hist[:, 0]
+        categories = expected > 4  # Chi-square needs reasonably populated cells
+
+        if np.count_nonzero(categories) < 2:
+            return None
+
+        statistic = float(np.sum((observed[categories] - expected[categories]) ** 2 / expected[categories]))
+        probability = float(chi2.sf(statistic, np.count_nonzero(categories) - 1))
+
+        return probability, {
+            "chi_square": round(statistic, 4),
+            "degrees_of_freedom": int(np.count_nonzero(categories) - 1),
+            "quantized": image.quantization is not None,
+        }
+
+
+@register_analyzer
+class SamplePairAnalyzer(SteganalysisAnalyzer):
+    """
+    Sample Pair Analysis (Dumitrescu, Wu and Wang). Adjacent pixel pairs
+    (u, v) are classified by how LSB replacement can move them between
+    trace sets, and the embedding rate is the smaller root of the quadratic
+    those counts satisfy. The score is the estimated rate.
+
+    Pairs are classified from shifted views of each strip, so no pair arrays
+    are materialized. Horizontal, vertical and diagonal neighbours are pooled
+    by default.
+    """
+
+    name = 'sample_pair_analysis'
+    cost = MODERATE_COST
+    requires = GRAY_INPUT
+    threshold = 0.1
+    directions = ('horizontal', 'vertical', 'diagonal')
+
+    def analyze(self, image):
+        # (X, Y, Z, W) pair counts per direction
+        counts = {direction: np.zeros(4, dtype=np.int64) for direction in self.directions}
+
+        # Strips overlap by one row so vertical and diagonal pairs across strip
+        # boundaries are counted exactly once
+        for strip in image.strips(STRIP_ROWS, overlap=1):
+            for direction in self.directions:
+                first, second = self._pair_views(strip, direction)
+                counts[direction] += self._count_pairs(first, second)
+
+        x, y, z, w = (float(total) for total in sum(counts.values()))
+        pairs = x + y + z
+        if pairs == 0:
+            return None
+
+        rate = self._embedding_rate(x, y, z, w, pairs)
+        if rate is None:
+            return None
+
+        details = {"estimated_embedding_rate": round(rate, 4), "pairs": int(pairs)}
+        for direction, direction_counts in counts.items():
+            direction_rate = self._embedding_rate(*(float(c) for c in direction_counts),
+                                                  float(direction_counts[:3].sum()))
+            if direction_rate is not None:
+                details[f"rate_{direction}"] = round(direction_rate, 4)
+
+        return rate, details
+
+    def _embedding_rate(self, x, y, z, w, pairs):
+        """
+        Solve the sample pair quadratic for the embedding rate.
+
+        Args:
+            x (float): Pairs with v even and u < v, or v odd and u > v
+            y (float): Pairs with v even and u > v, or v odd and u < v
+            z (float): Pairs with u == v
+            w (float): Pairs differing only in the least significant bit
+            pairs (float): Total number of pairs
+
+        Returns:
+            float: Estimated fraction of pixels carrying a message, or None
+                if the counts are degenerate
+        """
+        if pairs == 0:
+            return None
+
+        a = 0.5 * (w + z)
+        b = 2 * x - pairs
+        c = y - x
+
+        if abs(a) < 1e-12:
+            if abs(b) < 1e-12:
+                return None
+            rate = -c / b
+        else:
+            discriminant = b * b - 4 * a * c
+            if discriminant < 0:
+                # The roots meet near 1 at full embedding and sampling noise
+                # pushes them off the real line; take their real part
+                rate = -b / (2 * a)
+            else:
+                # a is a non-negative count, so this is the smaller root
+                rate = (-b - discriminant ** 0.5) / (2 * a)
+
+        return min(max(0.0, rate), 1.0)
+
+    def _pair_views(self, pixels, direction):
+        """
+        Return two aligned views whose elementwise pairs are the neighbours
+        in the given direction.
+        """
+        if direction == 'horizontal':
+            # The overlap row belongs to the next strip
+            own_rows = pixels[:STRIP_ROWS]
+            return own_rows[:, :-1], own_rows[:, 1:]
+        if direction == 'vertical':
+            return pixels[:-1], pixels[1:]
+        if direction == 'diagonal':
+            return pixels[:-1, :-1], pixels[1:, 1:]
+        raise ValueError(f"Unknown pair direction: {direction}")
+
+    def _count_pairs(self, u, v):
+        """
+        Count the X, Y, Z and W pairs between two aligned views.
+
+        Returns:
+            numpy.ndarray: Counts of (X, Y, Z, W) pairs
+        """
+        differ = u != v
+        unequal = np.count_nonzero(differ)
+        equal = u.size - unequal
+        # X: the smaller value of an unequal pair is on the side v's parity predicts
+        x = np.count_nonzero(differ & ((u < v) == ((v & 1) == 0)))
+        same_trace = np.count_nonzero((u >> 1) == (v >> 1))
+        return np.array([x, unequal - x, equal, same_trace - equal], dtype=np.int64)
+
+
+@register_analyzer
+class RSAnalyzer(SteganalysisAnalyzer):
+    """
+    RS (Regular-Singular) analysis over every 2x2 pixel group. The score is
+    the estimated LSB embedding rate.
+    """
+
+    name = 'rs_analysis'
+    cost = MODERATE_COST
+    requires = GRAY_INPUT
+    threshold = 0.1
+
+    def analyze(self, image):
+        counts = np.zeros(4, dtype=np.int64)
+        counts_flipped = np.zeros(4, dtype=np.int64)
+
+        for strip in image.strips(STRIP_ROWS):
+            # Groups are 2x2 blocks, so trim any odd trailing row or column
+            rows, cols = strip.shape
+            strip = strip[:rows - rows % 2, :cols - cols % 2]
+            if strip.size == 0:
+                continue
+
+            # Group statistics for the image and for the image with all LSBs flipped
+            counts += self._group_counts(strip)
+            counts_flipped += self._group_counts(strip ^ 1)
+
+        if counts.sum() == 0:
+            return None
+
+        rate = self._embedding_rate(counts, counts_flipped)
+        if rate is None:
+            return None
+
+        return rate, {
+            "estimated_embedding_rate": round(rate, 4),
+            "regular_m": int(counts[0]),
+            "singular_m": int(counts[1]),
+            "regular_neg_m": int(counts[2]),
+            "singular_neg_m": int(counts[3]),
+        }
+
+    def _group_counts(self, pixels):
+        """
+        Count regular and singular 2x2 groups under the masks M and -M.
+
+        Each group is read in snake order (top-left, top-right, bottom-right,
+        bottom-left) so consecutive pixels are neighbours, and the mask flips
+        the two middle pixels. All groups are evaluated at once through strided
+        views of the image.
+
+        Args:
+            pixels (numpy.ndarray): Grayscale image with even height and width
+
+        Returns:
+            numpy.ndarray: Counts of (R_M, S_M, R_-M, S_-M) groups
+        """
+        g0 = pixels[0::2, 0::2].astype(np.int16)
+        g1 = pixels[0::2, 1::2].astype(np.int16)
+        g2 = pixels[1::2, 1::2].astype(np.int16)
+        g3 = pixels[1::2, 0::2].astype(np.int16)
+
+        def smoothness(a, b, c, d):
+            return np.abs(b - a) + np.abs(c - b) + np.abs(d - c)
+
+        base = smoothness(g0, g1, g2, g3)
+        # F1 flips 2n <-> 2n+1, F-1 flips 2n-1 <-> 2n
+        positive = smoothness(g0, g1 ^ 1, g2 ^ 1, g3)
+        negative = smoothness(g0, ((g1 + 1) ^ 1) - 1, ((g2 + 1) ^ 1) - 1, g3)
+
+        return np.array([
+            np.count_nonzero(positive > base),
+            np.count_nonzero(positive < base),
+            np.count_nonzero(negative > base),
+            np.count_nonzero(negative < base),
+        ], dtype=np.int64)
+
+    def _embedding_rate(self, counts, counts_flipped):
+        """
+        Estimate the LSB embedding rate from RS group counts.
+
+        Solves Fridrich's quadratic for the image and its LSB-flipped
+        counterpart and converts the smaller root into a message length.
+        The quadratic is homogeneous in the counts, so raw group counts can be
+        passed without normalising them first.
+
+        Near full embedding the quadratic has no usable root: R_M and S_M
+        meet while R_-M and S_-M stay apart. When the counts show that
+        separation the rate is clamped to 1.0 rather than left undecided.
+
+        Args:
+            counts (numpy.ndarray): Group counts for the image
+            counts_flipped (numpy.ndarray): Group counts for the LSB-flipped image
+
+        Returns:
+            float: Estimated fraction of pixels carrying a message, or None
+                if the counts are too degenerate to estimate it
+        """
+        r_m, s_m, r_neg, s_neg = (float(count) for count in counts)
+        r_m_flipped, s_m_flipped, r_neg_flipped, s_neg_flipped = (float(count) for count in counts_flipped)
+
+        d0 = r_m - s_m
+        d1 = r_m_flipped - s_m_flipped
+        d_neg0 = r_neg - s_neg
+        d_neg1 = r_neg_flipped - s_neg_flipped
+
+        saturated = d_neg0 > 0 and d0 <= RS_SATURATION_RATIO * d_neg0
+        unsolvable = 1.0 if saturated else None
+
+        a = 2 * (d1 + d0)
+        b = d_neg0 - d_neg1 - d1 - 3 * d0
+        c = d0 - d_neg0
+
+        if abs(a) < 1e-12:
+            if abs(b) < 1e-12:
+                return unsolvable
+            x = -c / b
+        else:
+            discriminant = b * b - 4 * a * c
+            if discriminant < 0:
+                return unsolvable
+            root = discriminant ** 0.5
+            x = min((-b + root) / (2 * a), (-b - root) / (2 * a), key=abs)
+
+        if abs(x - 0.5) < RS_ROOT_TOLERANCE:
+            return unsolvable
+        return min(max(0.0, x / (x - 0.5)), 1.0)
+
+
+@register_analyzer
+class PVDAnalyzer(SteganalysisAnalyzer):
+    """
+    Pixel Value Differencing: counts unusual peaks in the histogram of
+    horizontal neighbour differences.
+    """
+
+    name = 'pvd_analysis'
+    cost = MODERATE_COST
+    requires = GRAY_INPUT
+    threshold = 0.5  # More than five peaks
+    weight = 0.0  # Uncalibrated peak count, reported only
+
+    def analyze(self, image):
+        # Accumulate the horizontal difference histogram strip by strip
+        diff_hist = np.zeros(256, dtype=np.int64)
+        for strip in image.strips(STRIP_ROWS):
+            horizontal_diffs = np.abs(np.diff(strip.astype(np.int16), axis=1))
+            diff_hist += np.bincount(horizontal_diffs.ravel(), minlength=256)
+
+        if diff_hist.sum() == 0:
+            return None
+
+        # Normalize histogram
+        diff_hist = diff_hist / np.sum(diff_hist)
+
+        # Check for unusual peaks in the histogram
+        mean_val = np.mean(diff_hist)
+        std_val = np.std(diff_hist)
+        peaks = int(np.count_nonzero(diff_hist > mean_val + 2 * std_val))
+
+        return peaks / (peaks + 5.0), {"histogram_peaks": peaks}
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    """Return the shared analysis thread pool, creating it on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = futures.ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='steganalysis')
+        return _executor
+
+
+def run_analyzers(image, names=None, time_budget=DEFAULT_TIME_BUDGET):
+    """
+    Run registered analyzers concurrently on a decoded image.
+
+    Analyzers are submitted cheapest first. Any analyzer still running when
+    the time budget is spent is reported with a 'timeout' verdict, and the
+    image is cancelled so it stops at its next strip instead of holding a
+    worker thread.
+
+    Args:
+        image (DecodedImage): Shared pixel context
+        names (list, optional): Analyzer names to run. Defaults to all registered.
+        time_budget (float, optional): Seconds allowed for all analyzers.
+            Defaults to DEFAULT_TIME_BUDGET.
+
+    Returns:
+        dict: Result dictionary per analyzer name
+    """
+    if names is None:
+        names = list(ANALYZERS)
+
+    analyzers = sorted((ANALYZERS[name]() for name in names), key=lambda a: COST_ORDER[a.cost])
+
+    # Build shared derived inputs up front rather than letting worker threads
+    # race to compute the lazy grayscale view
+    if any(analyzer.requires != COLOR_INPUT for analyzer in analyzers):
+        image.gray
+
+    executor = _get_executor()
+    submitted = [(analyzer, executor.submit(analyzer.run, image)) for analyzer in analyzers]
+
+    deadline = time.monotonic() + time_budget
+    results = {}
+    for analyzer, future in submitted:
+        try:
+            results[analyzer.name] = future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except futures.TimeoutError:
+            # Analyzers already running stop at their next strip
+            image.cancel()
+            future.cancel()
+            logging.warning(f"{analyzer.name} exceeded the {time_budget}s analysis budget")
+            results[analyzer.name] = analyzer._result(None, TIMEOUT)
+
+    return results
+
+
+def summarize_analyses(results):
+    """
+    Aggregate analyzer results into an overall verdict.
+
+    The verdict comes from the weighted mean of the scores of analyzers with
+    a weight, so a single heuristic firing does not flag the image.
+    Unweighted analyzers are still listed when their own threshold is
+    exceeded.
+
+    Args:
+        results (dict): Output of run_analyzers
+
+    Returns:
+        dict: Overall verdict, combined and highest scores, and the
+            suspicious analyzer names
+    """
+    scores = [result["score"] for result in results.values() if result.get("score") is not None]
+    weighted = [(result["score"], result.get("weight", 0.0)) for result in results.values()
+                if result.get("score") is not None and result.get("weight", 0.0) > 0]
+    suspicious = sorted(name for name, result in results.items() if result.get("suspicious"))
+
+    combined = None
+    if weighted:
+        combined = sum(score * weight for score, weight in weighted) / sum(weight for _, weight in weighted)
+        verdict = SUSPICIOUS if combined > VERDICT_THRESHOLD else CLEAN
+    else:
+        verdict = INCONCLUSIVE
+
+    return {
+        "verdict": verdict,
+        "combined_score": round(combined, 4) if combined is not None else None,
+        "verdict_threshold": VERDICT_THRESHOLD,
+        "max_score": max(scores) if scores else None,
+        "suspicious_count": len(suspicious),
+        "suspicious_analyses": suspicious,
+    }